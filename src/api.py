@@ -0,0 +1,395 @@
+import argparse
+import base64
+import binascii
+import json
+import os
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+import numpy as np
+from data import bootstrap
+from models.positions import get_positions
+from models.questions import get_question, query_questions
+from models.timeseries import get_price_history
+from models.trades import execute_trade
+from models.users import authenticate_user
+from models.votes import get_question_votes_page
+
+# 面向程序调用的 JSON HTTP 接口，直接调用 models 层，不经过 Streamlit 渲染
+# 使用 HTTP/1.1 长连接；不带 limit 的列表请求以 chunked 编码逐页流式返回
+# 认证：HTTP Basic，用户名和密码与登录页相同（authenticate_user）
+#
+# GET  /questions                      问题列表（status、tag、created_by、order_by、desc、limit、cursor）
+# GET  /questions/<id>                 问题详情
+# GET  /questions/<id>/prices          当前概率（history=1 时附带概率走势，max_points 控制点数）
+# GET  /questions/<id>/positions       当前用户的持仓
+# GET  /questions/<id>/votes           投票历史（limit、cursor）
+# POST /questions/<id>/trades          执行交易，请求体 {"orders": {选项: 带符号数量}}
+
+API_HOST = os.environ.get("VOTING_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("VOTING_API_PORT", "8600"))
+# 空闲长连接保持的秒数
+API_KEEPALIVE_TIMEOUT = 30.0
+# 分页请求的最大每页数量
+API_MAX_PAGE_SIZE = 1000
+# 流式返回时每次从数据库读取并写出的记录数
+API_STREAM_PAGE_SIZE = 200
+# 请求体最大字节数
+API_MAX_BODY_BYTES = 64 * 1024
+
+
+class ApiError(Exception):
+    """请求处理失败，携带返回给客户端的状态码"""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value: Any) -> Any:
+    """序列化 numpy 数组和标量"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _reject_constant(name: str) -> Any:
+    """拒绝非标准的 JSON 常量"""
+    raise ValueError(f"invalid JSON constant: {name}")
+
+
+def _dumps(value: Any) -> str:
+    """序列化为 JSON 字符串"""
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def encode_cursor(cursor: Optional[Tuple[Any, Any]]) -> Optional[str]:
+    """将分页游标编码为不透明字符串"""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(_dumps(list(cursor)).encode()).decode()
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[Any, Any]]:
+    """解码客户端传回的分页游标"""
+    if not token:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "invalid cursor")
+    if not isinstance(cursor, list) or len(cursor) != 2:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "invalid cursor")
+    return tuple(cursor)
+
+
+def _iter_pages(
+    fetch: Callable[[Optional[Tuple[Any, Any]]], Tuple[list, Optional[Tuple[Any, Any]]]],
+    first: Optional[Tuple[list, Optional[Tuple[Any, Any]]]] = None,
+) -> Iterator[list]:
+    """按游标逐页读取，直到没有下一页；first 为已读取的第一页"""
+    rows, cursor = first if first is not None else fetch(None)
+    yield rows
+    while cursor is not None:
+        rows, cursor = fetch(cursor)
+        yield rows
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """JSON 接口请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    timeout = API_KEEPALIVE_TIMEOUT
+    # 响应头和响应体分两次写出，长连接上需关闭 Nagle 算法避免延迟确认带来的等待
+    disable_nagle_algorithm = True
+
+    # 路由：(方法, 路径正则, 处理方法名)
+    ROUTES = [
+        ("GET", re.compile(r"^/questions/?$"), "handle_list_questions"),
+        ("GET", re.compile(r"^/questions/(?P<question_id>[^/]+)/?$"), "handle_get_question"),
+        ("GET", re.compile(r"^/questions/(?P<question_id>[^/]+)/prices/?$"), "handle_get_prices"),
+        ("GET", re.compile(r"^/questions/(?P<question_id>[^/]+)/positions/?$"), "handle_get_positions"),
+        ("GET", re.compile(r"^/questions/(?P<question_id>[^/]+)/votes/?$"), "handle_list_votes"),
+        ("POST", re.compile(r"^/questions/(?P<question_id>[^/]+)/trades/?$"), "handle_create_trade"),
+    ]
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    # 其他方法没有路由，分发后按路径返回 JSON 格式的 405 或 404，而不是默认的 HTML 501
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def do_PATCH(self) -> None:
+        self._dispatch("PATCH")
+
+    # 请求分发
+    def _dispatch(self, method: str) -> None:
+        """认证、路由并调用处理方法，错误统一以 JSON 返回"""
+        url = urlsplit(self.path)
+        self.query = parse_qs(url.query)
+        try:
+            # 先读完请求体，出错时长连接上的下一个请求才能正确解析
+            body = self._read_body()
+            route = self._match(method, url.path)
+            self.user = self._authenticate()
+            handler, params = route
+            handler(body=body, **params)
+        except ApiError as e:
+            self._send_json(e.status, {"error": e.message})
+        except Exception as e:
+            print(f"Error handling API request {method} {self.path}: {e}")
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"})
+
+    def _match(self, method: str, path: str) -> Tuple[Callable[..., None], Dict[str, str]]:
+        """按方法和路径查找处理方法"""
+        allowed = False
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return getattr(self, name), {k: unquote(v) for k, v in match.groupdict().items()}
+                allowed = True
+        if allowed:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "method not allowed")
+        raise ApiError(HTTPStatus.NOT_FOUND, "not found")
+
+    def _authenticate(self) -> Dict[str, Any]:
+        """HTTP Basic 认证"""
+        header = self.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() == "basic" and token:
+            try:
+                username, _, password = base64.b64decode(token).decode().partition(":")
+            except (binascii.Error, UnicodeDecodeError):
+                username = password = ""
+            user = authenticate_user(username, password) if username else None
+            if user:
+                return user
+        raise ApiError(HTTPStatus.UNAUTHORIZED, "authentication required")
+
+    def _read_body(self) -> Optional[Any]:
+        """读取并解析 JSON 请求体，没有请求体时返回None"""
+        value = (self.headers.get("Content-Length") or "0").strip()
+        # 只接受非负十进制整数；长度无法确定时请求体边界未知，必须关闭连接
+        if not (value.isascii() and value.isdigit()):
+            self.close_connection = True
+            raise ApiError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        length = int(value)
+        if length > API_MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+        if not length:
+            return None
+        raw = self.rfile.read(length)
+        try:
+            # 只接受标准 JSON，NaN / Infinity 视为格式错误
+            return json.loads(raw, parse_constant=_reject_constant)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "invalid JSON body")
+
+    # 查询参数
+    def _param(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """获取单个查询参数"""
+        values = self.query.get(name)
+        return values[-1] if values else default
+
+    def _flag(self, name: str) -> bool:
+        """获取布尔查询参数"""
+        return self._param(name, "0").lower() in ("1", "true", "yes")
+
+    def _int_param(self, name: str, default: Optional[int], minimum: int, maximum: int) -> Optional[int]:
+        """获取整数查询参数并检查范围"""
+        value = self._param(name)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+        if not minimum <= number <= maximum:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be between {minimum} and {maximum}")
+        return number
+
+    def _require_question(self, question_id: str) -> Dict[str, Any]:
+        """获取问题，不存在时返回404"""
+        question = get_question(question_id)
+        if question is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "question not found")
+        return question
+
+    # 响应
+    def _send_json(self, status: HTTPStatus, payload: Any) -> None:
+        """以 Content-Length 返回完整的 JSON 响应"""
+        data = _dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if status == HTTPStatus.UNAUTHORIZED:
+            self.send_header("WWW-Authenticate", 'Basic realm="voting"')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text: str) -> None:
+        """写出一个 chunked 编码的数据块"""
+        data = text.encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    def _send_stream(self, key: str, pages: Iterable[list]) -> None:
+        """以 chunked 编码流式返回 {key: [...]}，每页写出一个数据块"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            separator = f'{{"{key}": ['
+            for rows in pages:
+                if rows:
+                    self._write_chunk(separator + ",".join(_dumps(row) for row in rows))
+                    separator = ","
+            self._write_chunk(("" if separator == "," else separator) + "]}")
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception as e:
+            # 响应头已发出，无法再返回错误状态，直接断开让客户端感知响应不完整
+            print(f"Error streaming API response {self.path}: {e}")
+            self.close_connection = True
+
+    # 处理方法
+    def handle_list_questions(self, body: Any) -> None:
+        """问题列表，不带 limit 时流式返回全部"""
+        filters = {
+            "status": self._param("status"),
+            "tags": self.query.get("tag"),
+            "created_by": self._param("created_by"),
+            "order_by": self._param("order_by", "created_at"),
+            "descending": self._param("desc", "1") != "0",
+        }
+        limit = self._int_param("limit", None, 1, API_MAX_PAGE_SIZE)
+        try:
+            if limit is None:
+                # 先取第一页，排序字段等参数错误在发出响应头之前返回400
+                first = query_questions(limit=API_STREAM_PAGE_SIZE, **filters)
+            else:
+                questions, next_cursor = query_questions(
+                    limit=limit, cursor=decode_cursor(self._param("cursor")), **filters
+                )
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+
+        if limit is not None:
+            self._send_json(HTTPStatus.OK, {"questions": questions, "next_cursor": encode_cursor(next_cursor)})
+            return
+        self._send_stream(
+            "questions",
+            _iter_pages(lambda c: query_questions(limit=API_STREAM_PAGE_SIZE, cursor=c, **filters), first),
+        )
+
+    def handle_get_question(self, body: Any, question_id: str) -> None:
+        """问题详情"""
+        self._send_json(HTTPStatus.OK, self._require_question(question_id))
+
+    def handle_get_prices(self, body: Any, question_id: str) -> None:
+        """当前概率，可附带概率走势"""
+        question = self._require_question(question_id)
+        payload = {
+            "question_id": question_id,
+            "status": question["status"],
+            "version": question["version"],
+            "pricing_mode": question["pricing_mode"],
+            "prices": dict(zip(question["options"], question["probabilities"].tolist())),
+        }
+        if self._flag("history"):
+            max_points = self._int_param("max_points", 500, 3, 5000)
+            history = get_price_history(question_id, max_points)
+            # 选项尚无成交的时间点为 NaN，JSON 中以 null 表示
+            probabilities = history["probabilities"]
+            history["probabilities"] = np.where(np.isnan(probabilities), None, probabilities)
+            payload["history"] = history
+        self._send_json(HTTPStatus.OK, payload)
+
+    def handle_get_positions(self, body: Any, question_id: str) -> None:
+        """当前用户在问题上的持仓"""
+        question = self._require_question(question_id)
+        username = self.user["username"]
+        holdings = get_positions(question_id, username).get(username, {})
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "question_id": question_id,
+                "username": username,
+                "positions": {
+                    option: holdings.get(i, 0.0) for i, option in enumerate(question["options"])
+                },
+            },
+        )
+
+    def handle_list_votes(self, body: Any, question_id: str) -> None:
+        """投票历史（时间倒序），不带 limit 时流式返回全部"""
+        self._require_question(question_id)
+        limit = self._int_param("limit", None, 1, API_MAX_PAGE_SIZE)
+        if limit is None:
+            self._send_stream(
+                "votes",
+                _iter_pages(lambda c: get_question_votes_page(question_id, API_STREAM_PAGE_SIZE, c)),
+            )
+            return
+        votes, next_cursor = get_question_votes_page(
+            question_id, limit, decode_cursor(self._param("cursor"))
+        )
+        self._send_json(HTTPStatus.OK, {"votes": votes, "next_cursor": encode_cursor(next_cursor)})
+
+    def handle_create_trade(self, body: Any, question_id: str) -> None:
+        """以当前用户执行一次交易"""
+        orders = body.get("orders") if isinstance(body, dict) else None
+        if not isinstance(orders, dict) or not orders:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'body must be {"orders": {option: amount}}')
+        try:
+            orders = {str(option): float(amount) for option, amount in orders.items()}
+        except (TypeError, ValueError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "order amounts must be numbers")
+
+        trade = execute_trade(question_id, self.user["username"], orders)
+        if not trade["success"]:
+            raise ApiError(HTTPStatus.BAD_REQUEST, trade["message"])
+        self._send_json(HTTPStatus.OK, trade)
+
+
+# 启动接口服务
+def serve(host: str = API_HOST, port: int = API_PORT) -> None:
+    """初始化数据库并启动接口服务（每个连接一个线程，阻塞直到中断）"""
+    if not bootstrap():
+        raise SystemExit("数据库初始化失败")
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    print(f"接口服务已启动: http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# 命令行入口
+def main():
+    """命令行入口：python src/api.py --port 8600"""
+    parser = argparse.ArgumentParser(description="预测平台 JSON 接口服务")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
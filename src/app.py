@@ -4,7 +4,9 @@ from views.login_page import login_page, logout
 from views.question_list_page import question_list_page
 from views.voting_platform_page import voting_platform_page
 from views.change_password_page import change_password_page
-from data import init_database, init_session_state, check_expired_questions
+from views.data_context import begin_rerun
+from views.timing import timed
+from data import bootstrap, init_session_state
 from datetime import datetime, timezone, timedelta
 
 
@@ -57,35 +59,36 @@ def render_back_button(current_page):
 
 
 def main():
-    # init
-    init_database()
-    # 初始化 session state
-    init_session_state()
+    # 记录整页运行耗时，与 fragment 单独重新运行的耗时对比
+    with timed("app"):
+        # 进程级初始化（建表、迁移、启动过期调度器），rerun 时直接跳过
+        bootstrap()
+        # 初始化 session state
+        init_session_state()
+        # 每次运行使用新的数据上下文，同一次运行中相同的查询只执行一次
+        begin_rerun()
 
-    # 检查过期问题
-    check_expired_questions()
+        # 设置页面配置
+        st.set_page_config(page_title="预测平台", page_icon="🎯", layout="centered")
 
-    # 设置页面配置
-    st.set_page_config(page_title="预测平台", page_icon="🎯", layout="centered")
+        # 渲染页面头部
+        render_header()
 
-    # 渲染页面头部
-    render_header()
+        # 获取页面配置
+        pages = get_page_config()
 
-    # 获取页面配置
-    pages = get_page_config()
+        # 处理页面导航
+        handle_page_navigation()
 
-    # 处理页面导航
-    handle_page_navigation()
+        # 渲染当前页面
+        current_page = pages[st.session_state.page]
+        st.title(f"🎯 {current_page['title']}")
 
-    # 渲染当前页面
-    current_page = pages[st.session_state.page]
-    st.title(f"🎯 {current_page['title']}")
+        # 渲染返回按钮
+        render_back_button(st.session_state.page)
 
-    # 渲染返回按钮
-    render_back_button(st.session_state.page)
-
-    # 执行当前页面函数
-    current_page["func"]()
+        # 执行当前页面函数
+        current_page["func"]()
 
 
 if __name__ == "__main__":
@@ -1,12 +1,16 @@
+import argparse
+import threading
+import time
 import streamlit as st
 from models.questions import (
     init_questions_table,
     list_questions,
-    check_expired_questions,
 )
-from models.votes import init_votes_table, create_vote
+from models.votes import init_votes_table
 from models.users import init_users_table
 from models.positions import init_positions_table
+from models.migrations import run_migrations
+from models.expiry import start_expiry_scheduler
 
 # 初始化数据库
 def init_database():
@@ -15,6 +19,40 @@ def init_database():
     init_questions_table()
     init_positions_table()
     init_votes_table()
+    return run_migrations()
+
+
+# 进程级初始化状态：Streamlit 每次 rerun 只重新执行页面脚本，本模块在进程内只加载一次
+_bootstrap_lock = threading.Lock()
+_bootstrap_done = False
+_bootstrap_stats = {"seconds": None, "completed_at": None}
+
+
+# 进程级初始化
+def bootstrap(start_scheduler=True):
+    """建表、执行迁移并启动后台调度器，每个进程只执行一次，后续调用直接返回"""
+    global _bootstrap_done
+    if _bootstrap_done:
+        return True
+
+    with _bootstrap_lock:
+        if _bootstrap_done:
+            return True
+        start = time.perf_counter()
+        if not init_database():
+            return False
+        if start_scheduler:
+            start_expiry_scheduler()
+        _bootstrap_stats["seconds"] = time.perf_counter() - start
+        _bootstrap_stats["completed_at"] = time.time()
+        _bootstrap_done = True
+    return True
+
+
+# 获取初始化耗时
+def get_bootstrap_stats():
+    """获取进程级初始化的耗时（秒）和完成时间，未初始化时为None"""
+    return dict(_bootstrap_stats)
 
 
 # 初始化会话状态
@@ -31,3 +69,20 @@ def init_session_state():
     if "username" not in st.session_state:
         st.session_state.username = None
 
+
+# 命令行入口
+def main():
+    """命令行入口：python src/data.py init"""
+    parser = argparse.ArgumentParser(description="预测平台数据库管理")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("init", help="建表并执行所有未执行的迁移")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        if not bootstrap(start_scheduler=False):
+            raise SystemExit("数据库初始化失败")
+        print(f"数据库初始化完成，耗时 {get_bootstrap_stats()['seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
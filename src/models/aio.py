@@ -0,0 +1,168 @@
+import asyncio
+import atexit
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from . import config
+from . import positions, questions, timeseries, trades, users, votes
+from .write_queue import WriteFn, get_write_queue, run_write
+
+# 异步数据访问
+# models 中的函数都是阻塞的 sqlite3 调用，这里提供对应的 async 版本，供异步接口服务和后台任务使用。
+# 读取在有界线程池中执行（线程数不超过连接池可用连接），并发请求在线程池队列中等待，不会每个请求占用一个线程；
+# 写入由单独的写线程串行执行，SQLite 同一时间只有一个写事务，串行提交避免多个线程争抢写锁；
+# 开启写入队列时写入队列的线程就是唯一的写线程，写入函数改为在多个线程中等待提交，以便合并到同一批次。
+# 直接提交 fn(cursor) 的写入（run_write_async）在开启写入队列时不占用线程。
+
+T = TypeVar("T")
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    """获取进程内共享的读/写线程池"""
+    with _executors_lock:
+        if name not in _executors:
+            if name == "read" or config.WRITE_QUEUE_ENABLED:
+                workers = config.AIO_READ_WORKERS
+            else:
+                workers = 1
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"db-aio-{name}"
+            )
+        return _executors[name]
+
+
+def shutdown(wait: bool = True) -> None:
+    """关闭读写线程池，等待已提交的操作完成"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+atexit.register(shutdown)
+
+
+async def run_read(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在读线程池中执行阻塞的读取函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor("read"), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_in_writer(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在写线程中执行阻塞的写入函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor("write"), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_write_async(fn: WriteFn) -> Any:
+    """提交一个写入 fn(cursor) 并等待提交完成
+
+    开启写入队列时直接提交给写入队列，不占用线程，多个协程的写入可以合并到同一批次提交；
+    否则在写线程中执行。
+    """
+    if config.WRITE_QUEUE_ENABLED:
+        return await asyncio.wrap_future(get_write_queue().submit(fn))
+    return await run_in_writer(run_write, fn)
+
+
+# 问题
+async def list_questions() -> List[Dict[str, Any]]:
+    """获取所有问题列表"""
+    return await run_read(questions.list_questions)
+
+
+async def query_questions(**filters: Any) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, str]]]:
+    """按条件分页查询问题，参数同 questions.query_questions"""
+    return await run_read(questions.query_questions, **filters)
+
+
+async def get_question(question_id: str) -> Optional[Dict[str, Any]]:
+    """获取单个问题，不存在时返回None"""
+    return await run_read(questions.get_question, question_id)
+
+
+async def get_tag_facets() -> Dict[str, int]:
+    """获取各标签的问题数"""
+    return await run_read(questions.get_tag_facets)
+
+
+async def create_question(question_data: Dict[str, Any]) -> bool:
+    """创建新问题"""
+    return await run_in_writer(questions.create_question, question_data)
+
+
+async def end_question(question_id: str, result: Dict[str, Any], end_by: str) -> bool:
+    """结束问题"""
+    return await run_in_writer(questions.end_question, question_id, result, end_by)
+
+
+async def delete_question(question_id: str, username: str) -> bool:
+    """删除问题及相关数据"""
+    return await run_in_writer(questions.delete_question, question_id, username)
+
+
+async def expire_questions(question_ids: Sequence[str]) -> int:
+    """将到期的问题标记为过期"""
+    return await run_in_writer(questions.expire_questions, question_ids)
+
+
+# 投票
+async def get_question_votes(question_id: str) -> List[Dict[str, Any]]:
+    """获取某个问题的所有投票历史（记录较多时请使用 iter_question_votes）"""
+    return await run_read(votes.get_question_votes, question_id)
+
+
+async def get_question_votes_page(
+    question_id: str, limit: int = 50, cursor: Optional[Tuple[str, int]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """按时间倒序分页获取问题的投票记录"""
+    return await run_read(votes.get_question_votes_page, question_id, limit, cursor)
+
+
+async def iter_question_votes(question_id: str, page_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+    """按时间倒序逐条产出问题的投票记录，每次只读取一页"""
+    cursor = None
+    while True:
+        page, cursor = await get_question_votes_page(question_id, page_size, cursor)
+        for vote in page:
+            yield vote
+        if cursor is None:
+            return
+
+
+async def get_option_vote_totals(question_id: str) -> Dict[int, float]:
+    """获取问题各选项的票数之和"""
+    return await run_read(votes.get_option_vote_totals, question_id)
+
+
+# 持仓、交易和概率历史
+async def get_positions(question_id: str, user_id: Optional[str] = None) -> Dict[str, Dict[int, float]]:
+    """获取指定问题的用户持仓信息"""
+    return await run_read(positions.get_positions, question_id, user_id)
+
+
+async def execute_trade(question_id: str, username: str, orders: Dict[str, float]) -> Dict[str, Any]:
+    """执行一次交易，返回值同 trades.execute_trade"""
+    return await run_in_writer(trades.execute_trade, question_id, username, orders)
+
+
+async def get_price_history(
+    question_id: str, max_points: int = timeseries.DEFAULT_MAX_POINTS, resolution: Optional[str] = None
+) -> Dict[str, object]:
+    """获取问题各选项的概率历史"""
+    return await run_read(timeseries.get_price_history, question_id, max_points, resolution)
+
+
+# 用户
+async def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """用户认证"""
+    return await run_read(users.authenticate_user, username, password)
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+from .config import QUESTION_SEQ_TTL
+from .database import db_connection
+
+# 数据变更计数表
+# 表名：change_counters
+# 字段：name，seq
+# 由触发器在对应表发生写入时递增，读取方比较计数判断缓存是否仍然有效（跨进程同样适用）
+
+# 问题变更序号表
+# 表名：question_changes
+# 字段：question_id，seq
+# 由触发器在该问题的投票写入和问题更新时递增，问题删除时删除对应行（序号视为0）
+
+
+def get_data_version(name: str) -> int:
+    """获取指定数据的变更计数"""
+    with db_connection() as (conn, c):
+        c.execute("SELECT seq FROM change_counters WHERE name = ?", (name,))
+        row = c.fetchone()
+    return row[0] if row else 0
+
+
+_question_seqs: Dict[str, Tuple[float, int]] = {}
+_question_seqs_lock = threading.Lock()
+
+
+def get_question_seq(question_id: str, max_age: float = QUESTION_SEQ_TTL) -> int:
+    """获取问题的变更序号
+
+    同一进程内 max_age 秒内的重复查询直接返回上次读取的序号，
+    大量页面同时轮询时每个问题每个周期只查询一次数据库。
+    """
+    now = time.monotonic()
+    with _question_seqs_lock:
+        entry = _question_seqs.get(question_id)
+        if entry is not None and now - entry[0] < max_age:
+            return entry[1]
+
+    with db_connection() as (conn, c):
+        c.execute("SELECT seq FROM question_changes WHERE question_id = ?", (question_id,))
+        row = c.fetchone()
+    seq = row[0] if row else 0
+    with _question_seqs_lock:
+        _question_seqs[question_id] = (now, seq)
+    return seq
+
+
+class VersionedCache:
+    """按数据变更计数失效的进程内缓存
+
+    每个键只保留一份数据及其对应的变更计数，计数变化时重新加载。
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._entries: Dict[Hashable, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: Hashable, version: int, loader: Callable[[], Tuple[int, Any]]) -> Any:
+        """获取缓存数据
+
+        Args:
+            key: 缓存键
+            version: 当前的变更计数
+            loader: 缓存失效时调用，返回 (加载时的变更计数, 数据)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+        loaded_version, value = loader()
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or current[0] <= loaded_version:
+                self._entries[key] = (loaded_version, value)
+        return value
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / total if total else 0.0
+        return stats
+
+
+_caches: Dict[str, VersionedCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> VersionedCache:
+    """获取指定名称的进程内共享缓存"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = VersionedCache(name)
+        return _caches[name]
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """获取所有缓存的命中统计"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -1,6 +1,80 @@
 # Database configuration
+import os
 from datetime import datetime, timezone, timedelta
 
 DB_PATH = 'voting_platform.db'
 # 设置时区为UTC+8
-TZ = timezone(timedelta(hours=8))
\ No newline at end of file
+TZ = timezone(timedelta(hours=8))
+
+# 连接池配置
+# DB_POOL_SIZE: 连接池最多保留的连接数
+# DB_POOL_TIMEOUT: 连接耗尽时等待空闲连接的秒数
+# DB_POOL_HEALTH_CHECK_INTERVAL: 空闲连接超过该秒数后，取出前先做健康检查
+DB_POOL_SIZE = 8
+DB_POOL_TIMEOUT = 10.0
+DB_POOL_HEALTH_CHECK_INTERVAL = 30.0
+
+# 存储配置
+# 每个配置对应一组连接级PRAGMA和写锁重试策略，通过环境变量 VOTING_DB_PROFILE 选择
+# journal_mode: 日志模式，WAL模式下读写互不阻塞；None表示保持SQLite默认
+# synchronous: 同步级别，WAL模式下NORMAL即可保证一致性
+# mmap_size: 内存映射大小（字节）
+# cache_size: 页缓存大小，负数表示KiB
+# busy_timeout_ms: 遇到锁时SQLite内部等待的毫秒数
+# lock_retries: 开启写事务失败后的最大重试次数
+# lock_backoff_base / lock_backoff_max: 重试退避的初始/最大秒数（指数退避）
+STORAGE_PROFILES = {
+    "legacy": {
+        "journal_mode": None,
+        "synchronous": None,
+        "mmap_size": None,
+        "cache_size": None,
+        "busy_timeout_ms": 5000,
+        "lock_retries": 0,
+        "lock_backoff_base": 0.0,
+        "lock_backoff_max": 0.0,
+    },
+    "concurrent": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "busy_timeout_ms": 5000,
+        "lock_retries": 5,
+        "lock_backoff_base": 0.05,
+        "lock_backoff_max": 1.0,
+    },
+}
+STORAGE_PROFILE = os.environ.get("VOTING_DB_PROFILE", "concurrent")
+
+# 乐观并发控制：版本号冲突时的最大重试次数
+CAS_MAX_RETRIES = 8
+
+# 写入队列：开启后所有问题/投票/持仓写入由单个后台线程批量提交（group commit）
+# WRITE_QUEUE_ENABLED: 通过环境变量 VOTING_WRITE_QUEUE=1 开启
+# WRITE_QUEUE_BATCH_SIZE: 单次提交最多合并的写入数
+# WRITE_QUEUE_MAX_DELAY_MS: 收到第一个写入后最多等待多少毫秒再提交
+WRITE_QUEUE_ENABLED = os.environ.get("VOTING_WRITE_QUEUE") == "1"
+WRITE_QUEUE_BATCH_SIZE = 64
+WRITE_QUEUE_MAX_DELAY_MS = 5
+
+# 过期调度器：后台线程在问题到期时将其标记为过期
+# EXPIRY_SCHEDULER_ENABLED: 通过环境变量 VOTING_EXPIRY_SCHEDULER=0 关闭
+# EXPIRY_LEASE_SECONDS: 调度租约有效期，多个进程中同一时间只有持有租约的进程执行过期处理
+# EXPIRY_POLL_INTERVAL: 续约并检查问题变更的最长间隔秒数
+EXPIRY_SCHEDULER_ENABLED = os.environ.get("VOTING_EXPIRY_SCHEDULER", "1") == "1"
+EXPIRY_LEASE_SECONDS = 15.0
+EXPIRY_POLL_INTERVAL = 5.0
+
+# 交易流水快照：同一问题每追加多少条投票记录保存一次状态快照，重建状态时只需重放快照之后的记录
+LEDGER_SNAPSHOT_INTERVAL = 500
+
+# 实时刷新：投票页面定时轮询问题的变更序号，序号增加时才重新运行页面
+# LIVE_REFRESH_INTERVAL: 轮询间隔秒数，通过环境变量 VOTING_LIVE_REFRESH_INTERVAL 设置
+# QUESTION_SEQ_TTL: 同一进程内变更序号的缓存秒数，多个页面在该时间内的轮询只查询一次数据库
+LIVE_REFRESH_INTERVAL = float(os.environ.get("VOTING_LIVE_REFRESH_INTERVAL", "3"))
+QUESTION_SEQ_TTL = 1.0
+
+# 异步数据访问（models.aio）：读取在有界线程池中执行，写入由单独的写线程串行执行
+# AIO_READ_WORKERS: 读线程数，为写线程和写入队列线程各留一个连接池连接
+AIO_READ_WORKERS = max(1, DB_POOL_SIZE - 2)
@@ -1,14 +1,370 @@
+import random
 import sqlite3
-from typing import Tuple
-from .config import DB_PATH
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from . import config
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """连接池在超时时间内没有可用连接"""
+
+
+def get_storage_profile() -> Dict[str, Any]:
+    """获取当前存储配置"""
+    try:
+        return config.STORAGE_PROFILES[config.STORAGE_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown storage profile: {config.STORAGE_PROFILE}")
+
+
+def apply_storage_profile(conn: sqlite3.Connection, profile: Dict[str, Any]) -> None:
+    """在新连接上应用存储配置中的PRAGMA"""
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout_ms'])}")
+    if profile["journal_mode"]:
+        conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    if profile["synchronous"]:
+        conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    if profile["mmap_size"] is not None:
+        conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    if profile["cache_size"] is not None:
+        conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+
+
+class ConnectionPool:
+    """线程安全的SQLite连接池
+
+    - 同一线程内嵌套获取连接时复用同一个连接（按深度计数，最外层释放时归还）
+    - 连接归还到池中后可被其他线程复用，池中最多保留 size 个连接
+    - 空闲超过 health_check_interval 秒的连接在取出前先执行健康检查
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 8,
+        timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        profile: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.db_path = db_path
+        self.profile = profile
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []
+        self._open = 0
+        self._closed = False
+        self._available = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "reentrant": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接，连接会在线程间传递，因此关闭同线程检查"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if self.profile:
+            apply_storage_profile(conn, self.profile)
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """检查连接是否可用"""
+        with self._available:
+            self._stats["health_checks"] += 1
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """关闭并丢弃一个连接"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._available:
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._available.notify()
+
+    def _checkout(self) -> sqlite3.Connection:
+        """从池中取出连接，必要时新建或等待"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, last_used = None, 0.0
+            with self._available:
+                while True:
+                    if self._closed:
+                        raise sqlite3.ProgrammingError("Connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._open < self.size:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available within {self.timeout}s"
+                        )
+                    self._stats["waits"] += 1
+                    self._available.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._available:
+                        self._open -= 1
+                        self._available.notify()
+                    raise
+                with self._available:
+                    self._stats["created"] += 1
+                return conn
+
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.health_check_interval and not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+            with self._available:
+                self._stats["reused"] += 1
+            return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """获取连接，同一线程内重复获取返回同一个连接"""
+        local = self._local
+        if getattr(local, "conn", None) is not None:
+            local.depth += 1
+            with self._available:
+                self._stats["reentrant"] += 1
+            return local.conn
+
+        conn = self._checkout()
+        local.conn = conn
+        local.depth = 1
+        return conn
+
+    def current_connection(self) -> Optional[sqlite3.Connection]:
+        """返回当前线程正在使用的连接，没有则返回None"""
+        return getattr(self._local, "conn", None)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """归还连接，最外层释放时回滚未提交的事务并放回池中"""
+        local = self._local
+        if getattr(local, "conn", None) is conn:
+            local.depth -= 1
+            if local.depth > 0:
+                return
+            local.conn = None
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._available:
+            if self._closed:
+                self._open -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    def check_health(self) -> Dict[str, int]:
+        """对所有空闲连接做健康检查，丢弃不可用的连接"""
+        with self._available:
+            idle, self._idle = self._idle, []
+        healthy = []
+        for conn, _ in idle:
+            if self._is_healthy(conn):
+                healthy.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+        with self._available:
+            self._idle.extend(healthy)
+            self._available.notify_all()
+        return {"healthy": len(healthy), "discarded": len(idle) - len(healthy)}
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计信息"""
+        with self._available:
+            return {
+                **self._stats,
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+            }
+
+    def close(self) -> None:
+        """关闭连接池及所有空闲连接"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._available.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """获取进程内共享的连接池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    config.DB_PATH,
+                    size=config.DB_POOL_SIZE,
+                    timeout=config.DB_POOL_TIMEOUT,
+                    health_check_interval=config.DB_POOL_HEALTH_CHECK_INTERVAL,
+                    profile=get_storage_profile(),
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    """关闭进程内共享的连接池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """获取连接池统计信息"""
+    return get_pool().stats()
+
+
+@contextmanager
+def db_connection() -> Iterator[Tuple[sqlite3.Connection, sqlite3.Cursor]]:
+    """从连接池获取连接和游标，退出时自动归还"""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn, conn.cursor()
+    finally:
+        pool.release(conn)
+
 
 def get_db_connection() -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
-    """获取数据库连接和游标"""
-    conn = sqlite3.connect(DB_PATH)
+    """获取数据库连接和游标，使用完后需调用 close_db_connection 归还"""
+    conn = get_pool().acquire()
     cursor = conn.cursor()
     return conn, cursor
 
+
 def close_db_connection(conn: sqlite3.Connection) -> None:
-    """关闭数据库连接"""
+    """归还数据库连接到连接池"""
     if conn:
-        conn.close()
\ No newline at end of file
+        get_pool().release(conn)
+
+
+_lock_stats = {
+    "transactions": 0,
+    "contended": 0,
+    "retries": 0,
+    "failures": 0,
+    "cas_conflicts": 0,
+    "wait_seconds": 0.0,
+    "max_wait_seconds": 0.0,
+}
+_lock_stats_lock = threading.Lock()
+
+
+def is_locked_error(error: Exception) -> bool:
+    """判断是否为数据库锁冲突错误"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and (
+        "locked" in message or "busy" in message
+    )
+
+
+def _record_lock_wait(waited: float, retries: int, failed: bool) -> None:
+    """记录一次开启写事务的锁等待情况"""
+    with _lock_stats_lock:
+        _lock_stats["transactions"] += 1
+        _lock_stats["retries"] += retries
+        _lock_stats["wait_seconds"] += waited
+        _lock_stats["max_wait_seconds"] = max(_lock_stats["max_wait_seconds"], waited)
+        if retries or waited > 0.001:
+            _lock_stats["contended"] += 1
+        if failed:
+            _lock_stats["failures"] += 1
+
+
+def record_cas_conflict() -> None:
+    """记录一次乐观并发写入的版本冲突"""
+    with _lock_stats_lock:
+        _lock_stats["cas_conflicts"] += 1
+
+
+def get_lock_stats() -> Dict[str, Any]:
+    """获取写锁等待统计"""
+    with _lock_stats_lock:
+        stats = dict(_lock_stats)
+    stats["avg_wait_seconds"] = (
+        stats["wait_seconds"] / stats["transactions"] if stats["transactions"] else 0.0
+    )
+    return stats
+
+
+def begin_immediate(conn: sqlite3.Connection) -> None:
+    """开启写事务，遇到锁冲突时按存储配置做有限次数的指数退避重试"""
+    profile = get_storage_profile()
+    retries = 0
+    start = time.monotonic()
+    while True:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            break
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or retries >= profile["lock_retries"]:
+                _record_lock_wait(time.monotonic() - start, retries, True)
+                raise
+            delay = min(
+                profile["lock_backoff_max"], profile["lock_backoff_base"] * 2 ** retries
+            )
+            retries += 1
+            time.sleep(delay * random.uniform(0.5, 1.0))
+    _record_lock_wait(time.monotonic() - start, retries, False)
+
+
+@contextmanager
+def transaction() -> Iterator[Tuple[sqlite3.Connection, sqlite3.Cursor]]:
+    """写事务：以 BEGIN IMMEDIATE 开始，正常退出时提交，异常时回滚
+
+    同一线程内嵌套使用时加入外层事务，由外层负责提交。
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        if conn.in_transaction:
+            yield conn, conn.cursor()
+            return
+        begin_immediate(conn)
+        try:
+            yield conn, conn.cursor()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        pool.release(conn)
@@ -0,0 +1,216 @@
+import atexit
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from . import config
+from .cache import get_data_version
+from .config import TZ
+from .database import transaction
+from .questions import expire_questions, load_pending_expiries
+
+# 调度租约表
+# 表名：scheduler_leases
+# 字段：name，owner，expires_at
+# expires_at: 租约到期的Unix时间戳，持有者在到期前续约，到期后其他进程可以接管
+
+# 过期调度器
+# 进程内只有一个调度线程，按过期时间维护最小堆，睡眠到最早的过期时间后将到期问题标记为过期。
+# 多个进程（多个Streamlit实例）通过租约选出一个进程执行过期处理，页面渲染本身不再写数据库。
+# question_lifecycle 计数变化时（新建、结束、删除问题或修改过期时间）重新加载堆，交易不会触发重新加载，其他进程的变更最迟在一个轮询间隔内生效。
+
+LEASE_NAME = "expiry"
+
+
+def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """获取或续约租约，租约空闲、已过期或已由自己持有时成功"""
+    now = time.time()
+    with transaction() as (conn, c):
+        c.execute(
+            """
+            INSERT INTO scheduler_leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE scheduler_leases.owner = excluded.owner OR scheduler_leases.expires_at < ?
+        """,
+            (name, owner, now + ttl, now),
+        )
+        return c.rowcount == 1
+
+
+def release_lease(name: str, owner: str) -> None:
+    """释放自己持有的租约"""
+    with transaction() as (conn, c):
+        c.execute(
+            "DELETE FROM scheduler_leases WHERE name = ? AND owner = ?", (name, owner)
+        )
+
+
+class ExpiryScheduler:
+    """按过期时间调度问题过期的后台线程"""
+
+    def __init__(self, lease_seconds: float = 15.0, poll_interval: float = 5.0) -> None:
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heap: List[Tuple[float, str]] = []
+        self._heap_version: Optional[int] = None
+        self._is_leader = False
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._stats = {"sweeps": 0, "expired": 0, "reloads": 0, "errors": 0}
+
+    def start(self) -> None:
+        """启动调度线程"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="expiry-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止调度线程并释放租约"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._stopping.set()
+            self._wakeup.set()
+            thread.join(timeout)
+
+    def wakeup(self) -> None:
+        """唤醒调度线程立即检查问题变更"""
+        self._wakeup.set()
+
+    def next_expiry(self) -> Optional[datetime]:
+        """调度器已知的下一个过期时间，未加载时返回None"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return datetime.fromtimestamp(self._heap[0][0], TZ)
+
+    def _reload(self) -> None:
+        """问题新建、删除或状态/过期时间变化时重新加载进行中问题的过期时间"""
+        version = get_data_version("question_lifecycle")
+        if version == self._heap_version:
+            return
+        version, pending = load_pending_expiries()
+        heap = [(expire_at.timestamp(), question_id) for question_id, expire_at in pending]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+            self._heap_version = version
+            self._stats["reloads"] += 1
+
+    def _sweep(self) -> None:
+        """将堆顶所有已到期的问题标记为过期"""
+        now = time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+        if not due:
+            return
+        try:
+            expired = expire_questions([question_id for _, question_id in due])
+        except Exception:
+            # 写入失败时放回堆中，并强制下一轮重新加载，避免这些问题一直停留在进行中
+            with self._lock:
+                for entry in due:
+                    heapq.heappush(self._heap, entry)
+                self._heap_version = None
+            raise
+        with self._lock:
+            self._stats["sweeps"] += 1
+            self._stats["expired"] += expired
+
+    def _seconds_until_next(self) -> float:
+        """距下一次需要醒来的秒数（最早过期时间与轮询间隔中较小者）"""
+        with self._lock:
+            if not self._heap:
+                return self.poll_interval
+            return max(0.0, min(self.poll_interval, self._heap[0][0] - time.time()))
+
+    def _run(self) -> None:
+        """调度线程主循环"""
+        last_renew = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - last_renew >= self.poll_interval or not self._is_leader:
+                    self._is_leader = acquire_lease(LEASE_NAME, self.owner, self.lease_seconds)
+                    last_renew = time.monotonic()
+                if self._is_leader:
+                    self._reload()
+                    self._sweep()
+                    timeout = self._seconds_until_next()
+                else:
+                    timeout = self.poll_interval
+            except Exception as e:
+                print(f"Error running expiry scheduler: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                timeout = self.poll_interval
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+        if self._is_leader:
+            try:
+                release_lease(LEASE_NAME, self.owner)
+            except Exception as e:
+                print(f"Error releasing expiry lease: {e}")
+            self._is_leader = False
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._heap)
+        stats["leader"] = self._is_leader
+        return stats
+
+
+_scheduler: Optional[ExpiryScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_expiry_scheduler() -> ExpiryScheduler:
+    """获取进程内共享的过期调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ExpiryScheduler(
+                    lease_seconds=config.EXPIRY_LEASE_SECONDS,
+                    poll_interval=config.EXPIRY_POLL_INTERVAL,
+                )
+                atexit.register(_scheduler.stop)
+    return _scheduler
+
+
+def start_expiry_scheduler() -> bool:
+    """启动过期调度器（配置关闭时不启动）"""
+    if not config.EXPIRY_SCHEDULER_ENABLED:
+        return False
+    get_expiry_scheduler().start()
+    return True
+
+
+def get_next_expiry() -> Optional[datetime]:
+    """获取下一个问题的过期时间，没有进行中的问题时返回None
+
+    本进程的调度器持有租约时直接使用其堆顶，否则从数据库读取。
+    """
+    scheduler = _scheduler
+    if scheduler is not None and scheduler.stats()["leader"]:
+        return scheduler.next_expiry()
+    _, pending = load_pending_expiries()
+    if not pending:
+        return None
+    return min(expire_at for _, expire_at in pending).astimezone(TZ)
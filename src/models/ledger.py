@@ -0,0 +1,198 @@
+import json
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+from . import config
+from .database import db_connection, transaction
+from .pricing import price_order
+from .questions import decode_probabilities, encode_probabilities, write_question_snapshot
+from .positions import write_position_lines
+
+# 交易流水与快照
+# votes 表是只追加的交易流水，question_snapshots 表定期保存问题状态。
+# 问题状态（概率、LMSR份额、持仓、各选项总持仓）可以由最近的快照加上之后的流水重放得到，
+# 用于审计，以及在迁移后重建派生表而不必重放全部历史。
+
+
+def maybe_snapshot(cursor, question_id: str) -> bool:
+    """在当前事务中检查快照之后的流水条数，达到间隔时保存新快照
+
+    Returns:
+        bool: 是否保存了快照
+    """
+    cursor.execute(
+        "SELECT COALESCE(MAX(last_vote_id), 0) FROM question_snapshots WHERE question_id = ?",
+        (question_id,),
+    )
+    last_vote_id = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT COUNT(*) FROM votes WHERE question_id = ? AND id > ?",
+        (question_id, last_vote_id),
+    )
+    if cursor.fetchone()[0] < config.LEDGER_SNAPSHOT_INTERVAL:
+        return False
+    write_question_snapshot(cursor, question_id)
+    return True
+
+
+def replay_on_cursor(
+    c,
+    question_id: str,
+    on_trade: Optional[Callable[[str, np.ndarray], None]] = None,
+    from_first_snapshot: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """在给定游标（所在事务）上从快照重放流水
+
+    Args:
+        on_trade: 每重放一笔交易后调用，参数为交易时间和交易后的概率
+        from_first_snapshot: 从最早的快照开始重放（默认从最近的快照开始）
+    """
+    c.execute(
+        "SELECT options, pricing_mode, liquidity FROM questions WHERE id = ?",
+        (question_id,),
+    )
+    row = c.fetchone()
+    if not row:
+        return None
+    options_json, pricing_mode, liquidity = row
+    option_count = len(json.loads(options_json))
+
+    c.execute(
+        f"""SELECT last_vote_id, probabilities, shares, positions FROM question_snapshots
+            WHERE question_id = ? ORDER BY last_vote_id {"ASC" if from_first_snapshot else "DESC"} LIMIT 1""",
+        (question_id,),
+    )
+    snapshot = c.fetchone()
+    if not snapshot:
+        return None
+    last_vote_id, probabilities_blob, shares_blob, positions_json = snapshot
+    probabilities = decode_probabilities(probabilities_blob)
+    shares = decode_probabilities(shares_blob) if shares_blob is not None else None
+    positions: Dict[str, np.ndarray] = {}
+    for user_id, option_index, amount in json.loads(positions_json):
+        positions.setdefault(user_id, np.zeros(option_count))[option_index] = amount
+
+    c.execute(
+        """SELECT id, username, vote, option_index, trade_id, created_at FROM votes
+           WHERE question_id = ? AND id > ? ORDER BY id""",
+        (question_id, last_vote_id),
+    )
+
+    # 同一交易的记录ID连续，按交易整体定价
+    replayed = 0
+    trade_id = None
+    trade_time = None
+    order = np.zeros(option_count)
+
+    def apply(order):
+        nonlocal probabilities, shares
+        probabilities, new_shares, _ = price_order(
+            pricing_mode, probabilities, order, shares=shares, liquidity=liquidity
+        )
+        if new_shares is not None:
+            shares = new_shares
+        if on_trade is not None:
+            on_trade(trade_time, probabilities)
+
+    for vote_id, username, vote, option_index, vote_trade_id, created_at in c.fetchall():
+        if trade_id is not None and vote_trade_id != trade_id:
+            apply(order)
+            order = np.zeros(option_count)
+        trade_id = vote_trade_id
+        trade_time = created_at
+        order[option_index] += vote
+        positions.setdefault(username, np.zeros(option_count))[option_index] += vote
+        last_vote_id = vote_id
+        replayed += 1
+    if trade_id is not None:
+        apply(order)
+
+    totals = np.zeros(option_count)
+    for amounts in positions.values():
+        totals += amounts
+    return {
+        "probabilities": np.asarray(probabilities),
+        "shares": shares,
+        "positions": positions,
+        "totals": totals,
+        "last_vote_id": last_vote_id,
+        "replayed": replayed,
+    }
+
+
+def replay_question(question_id: str) -> Optional[Dict[str, Any]]:
+    """由最近快照加之后的流水重建问题状态
+
+    Returns:
+        Optional[Dict[str, Any]]: probabilities 概率，shares LMSR份额（其他为None），
+            positions 用户到各选项持仓数组的映射，totals 各选项总持仓，
+            last_vote_id 最后重放的记录ID，replayed 重放的记录数；问题或快照不存在时为None
+    """
+    with db_connection() as (conn, c):
+        snapshot = not conn.in_transaction
+        if snapshot:
+            c.execute("BEGIN")
+        state = replay_on_cursor(c, question_id)
+        if snapshot:
+            conn.rollback()
+    return state
+
+
+def verify_question_state(question_id: str, tolerance: float = 1e-9) -> bool:
+    """检查存储的概率和持仓是否与流水重放结果一致"""
+    with db_connection() as (conn, c):
+        c.execute("BEGIN")
+        try:
+            state = replay_on_cursor(c, question_id)
+            if state is None:
+                return False
+            c.execute("SELECT probabilities FROM questions WHERE id = ?", (question_id,))
+            stored = decode_probabilities(c.fetchone()[0])
+            c.execute(
+                "SELECT user_id, option_index, amount FROM position_lines WHERE question_id = ?",
+                (question_id,),
+            )
+            stored_positions = {(u, i): a for u, i, a in c.fetchall()}
+        finally:
+            conn.rollback()
+
+    replayed_positions = {
+        (user_id, i): amount
+        for user_id, amounts in state["positions"].items()
+        for i, amount in enumerate(amounts)
+        if abs(amount) > tolerance
+    }
+    return (
+        np.allclose(stored, state["probabilities"], atol=tolerance)
+        and stored_positions.keys() == replayed_positions.keys()
+        and all(
+            abs(stored_positions[key] - amount) <= tolerance
+            for key, amount in replayed_positions.items()
+        )
+    )
+
+
+def rebuild_question_state(question_id: str) -> bool:
+    """用流水重放结果重写问题的概率、份额和持仓，并保存新快照"""
+    try:
+        with transaction() as (conn, c):
+            state = replay_on_cursor(c, question_id)
+            if state is None:
+                return False
+            c.execute(
+                """UPDATE questions SET probabilities = ?, shares = ?, version = version + 1
+                   WHERE id = ?""",
+                (
+                    encode_probabilities(state["probabilities"]),
+                    encode_probabilities(state["shares"]) if state["shares"] is not None else None,
+                    question_id,
+                ),
+            )
+            c.execute("DELETE FROM position_lines WHERE question_id = ?", (question_id,))
+            for user_id, amounts in state["positions"].items():
+                amounts = np.where(np.abs(amounts) < 1e-9, 0.0, amounts)
+                write_position_lines(c, question_id, user_id, amounts.tolist())
+            write_question_snapshot(c, question_id)
+        return True
+    except Exception as e:
+        print(f"Error rebuilding question state: {e}")
+        return False
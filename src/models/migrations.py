@@ -0,0 +1,630 @@
+import json
+import sqlite3
+import struct
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from .database import db_connection, transaction
+
+# 数据库版本表
+# 表名：schema_version
+# 字段：version，description，applied_at
+# 迁移按版本号顺序执行，每个迁移在独立的写事务中执行并记录版本号
+# 已发布的迁移只使用本文件内固定的SQL和编码逻辑，不调用 models 中会随版本变化的函数
+
+
+def init_schema_version_table() -> bool:
+    """初始化数据库版本表"""
+    try:
+        with db_connection() as (conn, c):
+            c.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error initializing schema_version table: {e}")
+        return False
+
+
+def _migration_001_secondary_indexes(c: sqlite3.Cursor) -> None:
+    """为投票历史和问题过期检查添加复合索引"""
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_votes_question_created ON votes (question_id, created_at)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_votes_username_created ON votes (username, created_at)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_status_expire ON questions (status, expire_at)"
+    )
+
+
+def _table_exists(c: sqlite3.Cursor, name: str) -> bool:
+    """检查表是否存在"""
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return c.fetchone() is not None
+
+
+def _column_exists(c: sqlite3.Cursor, table: str, column: str) -> bool:
+    """检查表中是否存在指定列"""
+    c.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in c.fetchall())
+
+
+def _migration_002_position_lines(c: sqlite3.Cursor) -> None:
+    """将旧版 positions 表的逗号分隔持仓转换为 position_lines 行"""
+    if not _table_exists(c, "positions"):
+        return
+
+    c.execute("SELECT question_id, user_id, position FROM positions")
+    lines = []
+    for question_id, user_id, position_str in c.fetchall():
+        for option_index, part in enumerate(position_str.split(",")):
+            try:
+                amount = float(part) if part else 0.0
+            except ValueError:
+                continue
+            if amount:
+                lines.append((question_id, user_id, option_index, amount))
+
+    c.executemany(
+        """
+        INSERT OR REPLACE INTO position_lines (question_id, user_id, option_index, amount)
+        VALUES (?, ?, ?, ?)
+    """,
+        lines,
+    )
+    c.execute("DROP TABLE positions")
+
+
+def _migration_003_packed_question_options(c: sqlite3.Cursor) -> None:
+    """将问题的逗号分隔选项和概率转换为JSON选项列表和float64数组BLOB"""
+    c.execute(
+        "SELECT id, options, probabilities FROM questions WHERE typeof(probabilities) = 'text'"
+    )
+    rows = []
+    for question_id, options_str, probabilities_str in c.fetchall():
+        probabilities = [float(p) for p in probabilities_str.split(",")]
+        rows.append(
+            (
+                json.dumps(options_str.split(","), ensure_ascii=False),
+                struct.pack(f"<{len(probabilities)}d", *probabilities),
+                question_id,
+            )
+        )
+    c.executemany(
+        "UPDATE questions SET options = ?, probabilities = ? WHERE id = ?", rows
+    )
+
+
+def _migration_004_question_version(c: sqlite3.Cursor) -> None:
+    """为问题添加乐观并发版本号"""
+    if not _column_exists(c, "questions", "version"):
+        c.execute("ALTER TABLE questions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _migration_005_change_counters(c: sqlite3.Cursor) -> None:
+    """添加数据变更计数表，并由触发器在问题表写入时递增"""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_counters (
+            name TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL DEFAULT 0
+        )
+    """
+    )
+    c.execute("INSERT OR IGNORE INTO change_counters (name, seq) VALUES ('questions', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_questions_{event.lower()}_counter
+            AFTER {event} ON questions
+            BEGIN
+                UPDATE change_counters SET seq = seq + 1 WHERE name = 'questions';
+            END
+        """
+        )
+
+
+def _migration_006_question_list_indexes(c: sqlite3.Cursor) -> None:
+    """为问题列表的筛选、排序和游标分页添加索引"""
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_created ON questions (created_at, id)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_status_created ON questions (status, created_at, id)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_creator_created ON questions (created_by, created_at, id)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_expire ON questions (expire_at, id)"
+    )
+    # (status, expire_at, id) 覆盖了原来的 (status, expire_at) 索引
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_status_expire_id ON questions (status, expire_at, id)"
+    )
+    c.execute("DROP INDEX IF EXISTS idx_questions_status_expire")
+
+
+def _migration_007_question_tags(c: sqlite3.Cursor) -> None:
+    """添加问题标签表并根据问题的逗号分隔标签回填"""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_tags (
+            question_id TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (tag, question_id)
+        ) WITHOUT ROWID
+    """
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_question_tags_question ON question_tags (question_id)"
+    )
+    c.execute("SELECT id, tags FROM questions WHERE tags IS NOT NULL AND tags != ''")
+    rows = [
+        (question_id, tag.strip())
+        for question_id, tags in c.fetchall()
+        for tag in tags.split(",")
+        if tag.strip()
+    ]
+    c.executemany(
+        "INSERT OR IGNORE INTO question_tags (question_id, tag) VALUES (?, ?)", rows
+    )
+
+
+def _migration_008_scheduler_leases(c: sqlite3.Cursor) -> None:
+    """添加后台调度租约表"""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """
+    )
+
+
+def _migration_009_lmsr_pricing(c: sqlite3.Cursor) -> None:
+    """为问题添加定价方式、LMSR流动性参数和份额"""
+    if not _column_exists(c, "questions", "pricing_mode"):
+        c.execute(
+            "ALTER TABLE questions ADD COLUMN pricing_mode TEXT NOT NULL DEFAULT 'linear'"
+        )
+    if not _column_exists(c, "questions", "liquidity"):
+        c.execute("ALTER TABLE questions ADD COLUMN liquidity REAL")
+    if not _column_exists(c, "questions", "shares"):
+        c.execute("ALTER TABLE questions ADD COLUMN shares BLOB")
+
+
+def _migration_010_vote_ledger(c: sqlite3.Cursor) -> None:
+    """将投票表改为只追加的交易流水，并为所有问题保存基线快照"""
+    if not _column_exists(c, "votes", "trade_id"):
+        c.execute("ALTER TABLE votes ADD COLUMN trade_id TEXT")
+    if not _column_exists(c, "votes", "option_index"):
+        c.execute("ALTER TABLE votes ADD COLUMN option_index INTEGER")
+
+    # 旧记录每条视为一次独立交易
+    c.execute("UPDATE votes SET trade_id = 'vote-' || id WHERE trade_id IS NULL")
+    c.execute(
+        """
+        UPDATE votes SET option_index = (
+            SELECT CAST(o.key AS INTEGER) FROM questions q, json_each(q.options) o
+            WHERE q.id = votes.question_id AND o.value = votes.option
+        )
+        WHERE option_index IS NULL
+    """
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_votes_question_id ON votes (question_id, id)"
+    )
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id TEXT NOT NULL,
+            last_vote_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            probabilities BLOB NOT NULL,
+            shares BLOB,
+            positions TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_question_snapshots_question ON question_snapshots (question_id, last_vote_id)"
+    )
+    # 旧记录使用的定价规则与当前不同，无法精确重放，以当前状态作为基线快照
+    c.execute(
+        """
+        INSERT INTO question_snapshots (question_id, last_vote_id, version, probabilities, shares, positions)
+        SELECT q.id,
+               COALESCE((SELECT MAX(id) FROM votes WHERE question_id = q.id), 0),
+               q.version, q.probabilities, q.shares,
+               (SELECT json_group_array(json_array(user_id, option_index, amount))
+                FROM position_lines WHERE question_id = q.id)
+        FROM questions q
+        WHERE q.id NOT IN (SELECT question_id FROM question_snapshots)
+    """
+    )
+
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_votes_no_update
+        BEFORE UPDATE ON votes
+        BEGIN
+            SELECT RAISE(ABORT, 'votes is append-only');
+        END
+    """
+    )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_votes_no_delete
+        BEFORE DELETE ON votes
+        WHEN EXISTS (SELECT 1 FROM questions WHERE id = OLD.question_id)
+        BEGIN
+            SELECT RAISE(ABORT, 'votes is append-only');
+        END
+    """
+    )
+
+
+def _migration_011_price_rollups(c: sqlite3.Cursor) -> None:
+    """添加概率时间序列汇总表，并由交易流水回填"""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS price_rollups (
+            question_id TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            option_index INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            trades INTEGER NOT NULL,
+            PRIMARY KEY (question_id, resolution, bucket, option_index)
+        ) WITHOUT ROWID
+    """
+    )
+    # 由每条流水记录的交易后概率回填（时间为 CURRENT_TIMESTAMP，UTC），
+    # 桶内没有交易的选项沿用该选项上一个桶的收盘价，第一次交易之前的桶没有该选项的行；
+    # 需要完整重放时可调用 timeseries.rebuild_price_rollups
+    c.execute("DELETE FROM price_rollups")
+    for resolution, seconds in (("minute", 60), ("hour", 3600), ("day", 86400)):
+        c.execute(
+            """
+            INSERT INTO price_rollups (question_id, resolution, bucket, option_index, open, high, low, close, trades)
+            SELECT question_id, ?, bucket, option_index,
+                   MAX(CASE WHEN first_rank = 1 THEN probability END),
+                   MAX(probability), MIN(probability),
+                   MAX(CASE WHEN last_rank = 1 THEN probability END),
+                   COUNT(DISTINCT trade_id)
+            FROM (
+                SELECT question_id, option_index, probability, trade_id, bucket,
+                       ROW_NUMBER() OVER (PARTITION BY question_id, option_index, bucket ORDER BY id) AS first_rank,
+                       ROW_NUMBER() OVER (PARTITION BY question_id, option_index, bucket ORDER BY id DESC) AS last_rank
+                FROM (
+                    SELECT id, question_id, option_index, probability, trade_id,
+                           CAST(strftime('%s', created_at) AS INTEGER) / ? * ? AS bucket
+                    FROM votes
+                    WHERE option_index IS NOT NULL AND probability IS NOT NULL
+                )
+            )
+            GROUP BY question_id, bucket, option_index
+        """,
+            (resolution, seconds, seconds),
+        )
+        # 问题的每个桶 × 有过交易的每个选项，缺失的行取同一选项最近一个有记录的桶的收盘价：
+        # run 为截至当前桶已有记录的桶数，同一 run 内只有第一行有收盘价
+        c.execute(
+            """
+            INSERT INTO price_rollups (question_id, resolution, bucket, option_index, open, high, low, close, trades)
+            WITH grid AS (
+                SELECT b.question_id, b.bucket, o.option_index, p.close
+                FROM (SELECT DISTINCT question_id, bucket FROM price_rollups WHERE resolution = ?1) AS b
+                JOIN (SELECT DISTINCT question_id, option_index FROM price_rollups WHERE resolution = ?1) AS o
+                    ON o.question_id = b.question_id
+                LEFT JOIN price_rollups AS p
+                    ON p.question_id = b.question_id AND p.resolution = ?1
+                    AND p.bucket = b.bucket AND p.option_index = o.option_index
+            ), runs AS (
+                SELECT question_id, bucket, option_index, close,
+                       COUNT(close) OVER (PARTITION BY question_id, option_index ORDER BY bucket) AS run
+                FROM grid
+            ), filled AS (
+                SELECT question_id, bucket, option_index, close,
+                       MAX(close) OVER (PARTITION BY question_id, option_index, run) AS carried
+                FROM runs
+            )
+            SELECT question_id, ?1, bucket, option_index, carried, carried, carried, carried, 0
+            FROM filled
+            WHERE close IS NULL AND carried IS NOT NULL
+        """,
+            (resolution,),
+        )
+
+
+def _migration_012_option_totals(c: sqlite3.Cursor) -> None:
+    """添加选项票数汇总表，并由投票记录回填"""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS option_totals (
+            question_id TEXT NOT NULL,
+            option_index INTEGER NOT NULL,
+            total REAL NOT NULL,
+            PRIMARY KEY (question_id, option_index)
+        ) WITHOUT ROWID
+    """
+    )
+    c.execute("DELETE FROM option_totals")
+    c.execute(
+        """
+        INSERT INTO option_totals (question_id, option_index, total)
+        SELECT question_id, option_index, SUM(vote) FROM votes
+        WHERE option_index IS NOT NULL
+        GROUP BY question_id, option_index
+    """
+    )
+
+
+def _migration_013_question_changes(c: sqlite3.Cursor) -> None:
+    """添加按问题的变更序号表，并由投票和问题表上的触发器递增"""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_changes (
+            question_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """
+    )
+    bumps = {
+        "votes_insert": ("INSERT", "votes", "NEW.question_id"),
+        "questions_insert": ("INSERT", "questions", "NEW.id"),
+        "questions_update": ("UPDATE", "questions", "NEW.id"),
+    }
+    for name, (event, table, question_id) in bumps.items():
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{name}_question_seq
+            AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO question_changes (question_id, seq) VALUES ({question_id}, 1)
+                ON CONFLICT (question_id) DO UPDATE SET seq = seq + 1;
+            END
+        """
+        )
+    # 问题删除后序号行一并删除，轮询方读到 0 同样会判断为有变更
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_delete_question_seq
+        AFTER DELETE ON questions
+        BEGIN
+            DELETE FROM question_changes WHERE question_id = OLD.id;
+        END
+    """
+    )
+
+
+def _migration_014_question_lifecycle_counters(c: sqlite3.Cursor) -> None:
+    """添加只在问题新建、删除和状态/过期时间变化时递增的变更计数
+
+    questions 计数在每次交易更新概率时都会递增，过期调度和标签统计只关心：
+    question_lifecycle: 新建、删除、status 或 expire_at 变化
+    question_set: 新建、删除
+    """
+    for name in ("question_lifecycle", "question_set"):
+        c.execute("INSERT OR IGNORE INTO change_counters (name, seq) VALUES (?, 0)", (name,))
+    for event in ("INSERT", "DELETE"):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_questions_{event.lower()}_lifecycle_counter
+            AFTER {event} ON questions
+            BEGIN
+                UPDATE change_counters SET seq = seq + 1
+                WHERE name IN ('question_lifecycle', 'question_set');
+            END
+        """
+        )
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_questions_update_lifecycle_counter
+        AFTER UPDATE OF status, expire_at ON questions
+        WHEN OLD.status IS NOT NEW.status OR OLD.expire_at IS NOT NEW.expire_at
+        BEGIN
+            UPDATE change_counters SET seq = seq + 1 WHERE name = 'question_lifecycle';
+        END
+    """
+    )
+
+
+# 迁移列表：(版本号, 描述, 迁移函数)，版本号必须递增
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "secondary indexes for votes and questions", _migration_001_secondary_indexes),
+    (2, "normalize positions into position_lines", _migration_002_position_lines),
+    (3, "store question options as JSON and probabilities as float64 blobs", _migration_003_packed_question_options),
+    (4, "optimistic concurrency version for questions", _migration_004_question_version),
+    (5, "change counters for cache invalidation", _migration_005_change_counters),
+    (6, "indexes for question list filtering and keyset pagination", _migration_006_question_list_indexes),
+    (7, "question_tags index table", _migration_007_question_tags),
+    (8, "leases for background schedulers", _migration_008_scheduler_leases),
+    (9, "LMSR pricing mode for questions", _migration_009_lmsr_pricing),
+    (10, "append-only vote ledger with question snapshots", _migration_010_vote_ledger),
+    (11, "probability time-series rollups", _migration_011_price_rollups),
+    (12, "maintained per-option vote totals", _migration_012_option_totals),
+    (13, "per-question change sequence for live refresh", _migration_013_question_changes),
+    (14, "question lifecycle counters for expiry scheduling and tag facets", _migration_014_question_lifecycle_counters),
+]
+
+
+def get_schema_version() -> int:
+    """获取当前数据库版本号"""
+    with db_connection() as (conn, c):
+        c.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return c.fetchone()[0]
+
+
+def run_migrations() -> bool:
+    """按顺序执行所有未执行的迁移"""
+    if not init_schema_version_table():
+        return False
+
+    for version, description, migrate in MIGRATIONS:
+        try:
+            with transaction() as (conn, c):
+                # 在写事务中重新检查版本号，避免多个进程重复执行同一迁移
+                c.execute(
+                    "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+                )
+                if c.fetchone():
+                    continue
+                migrate(c)
+                c.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description),
+                )
+        except Exception as e:
+            print(f"Error running migration {version} ({description}): {e}")
+            return False
+    return True
+
+
+# 关键查询及其期望使用的索引，用于 EXPLAIN QUERY PLAN 检查
+# (SQL, 参数, 期望出现在执行计划中的索引名, 是否允许额外排序)
+# 按标签筛选时先通过标签索引取出少量问题再排序，因此允许额外排序
+INDEXED_QUERIES: Dict[str, Tuple[str, Sequence[Any], str, bool]] = {
+    "get_question_votes_page": (
+        """SELECT id, username, vote, created_at, option, probability
+           FROM votes WHERE question_id = ? AND (created_at, id) < (?, ?)
+           ORDER BY created_at DESC, id DESC LIMIT 51""",
+        ("", "", 0),
+        "idx_votes_question_created",
+        False,
+    ),
+    "get_user_votes": (
+        """SELECT id, question_id, vote, created_at, option, probability
+           FROM votes WHERE username = ?
+           ORDER BY created_at DESC""",
+        ("",),
+        "idx_votes_username_created",
+        False,
+    ),
+    "check_user_voted": (
+        "SELECT COUNT(*) FROM votes WHERE username = ? AND question_id = ?",
+        ("", ""),
+        "idx_votes_",
+        False,
+    ),
+    "replay_question": (
+        """SELECT id, username, vote, option_index, trade_id FROM votes
+           WHERE question_id = ? AND id > ? ORDER BY id""",
+        ("", 0),
+        "idx_votes_question_id",
+        False,
+    ),
+    "get_price_history": (
+        """SELECT bucket, option_index, close FROM price_rollups
+           WHERE question_id = ? AND resolution = ? AND option_index < ?
+           ORDER BY bucket, option_index""",
+        ("", "minute", 2),
+        "PRIMARY KEY",
+        False,
+    ),
+    "get_option_vote_totals": (
+        "SELECT option_index, total FROM option_totals WHERE question_id = ?",
+        ("",),
+        "PRIMARY KEY",
+        False,
+    ),
+    "get_positions_totals": (
+        "SELECT question_id, SUM(amount) FROM position_lines GROUP BY question_id",
+        (),
+        "COVERING INDEX idx_position_lines_option",
+        False,
+    ),
+    "get_option_position_totals": (
+        """SELECT option_index, SUM(amount) FROM position_lines
+           WHERE question_id = ? GROUP BY option_index""",
+        ("",),
+        "idx_position_lines_option",
+        False,
+    ),
+    "load_pending_expiries": (
+        "SELECT id, expire_at FROM questions WHERE status = 'progress'",
+        (),
+        "idx_questions_status_expire_id",
+        False,
+    ),
+    "query_questions": (
+        """SELECT id FROM questions
+           WHERE (created_at, id) < (?, ?)
+           ORDER BY created_at DESC, id DESC LIMIT 51""",
+        ("", ""),
+        "idx_questions_created",
+        False,
+    ),
+    "query_questions_by_status": (
+        """SELECT id FROM questions
+           WHERE status = ? AND (created_at, id) < (?, ?)
+           ORDER BY created_at DESC, id DESC LIMIT 51""",
+        ("", "", ""),
+        "idx_questions_status_created",
+        False,
+    ),
+    "query_questions_by_creator": (
+        """SELECT id FROM questions
+           WHERE created_by = ?
+           ORDER BY created_at DESC, id DESC LIMIT 51""",
+        ("",),
+        "idx_questions_creator_created",
+        False,
+    ),
+    "query_questions_by_tags": (
+        """SELECT id FROM questions
+           WHERE id IN (SELECT question_id FROM question_tags WHERE tag IN (?, ?))
+           ORDER BY created_at DESC, id DESC LIMIT 51""",
+        ("", ""),
+        "question_tags USING PRIMARY KEY",
+        True,
+    ),
+}
+
+
+def explain_query_plan(sql: str, params: Sequence[Any] = ()) -> List[str]:
+    """获取查询的执行计划描述"""
+    with db_connection() as (conn, c):
+        c.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in c.fetchall()]
+
+
+def check_index_usage() -> Dict[str, Dict[str, Any]]:
+    """检查关键查询是否使用了预期索引且不需要额外排序
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 查询名称到检查结果的映射，
+            包含执行计划 plan 和是否通过 ok
+    """
+    report = {}
+    for name, (sql, params, index_name, allow_sort) in INDEXED_QUERIES.items():
+        plan = explain_query_plan(sql, params)
+        uses_index = any(
+            "USING" in step and index_name in step for step in plan
+        )
+        needs_sort = not allow_sort and any("TEMP B-TREE" in step for step in plan)
+        report[name] = {"plan": plan, "ok": uses_index and not needs_sort}
+    return report
+
+
+if __name__ == "__main__":
+    print(f"schema version: {get_schema_version()}")
+    for name, result in check_index_usage().items():
+        status = "OK " if result["ok"] else "BAD"
+        print(f"[{status}] {name}: {' | '.join(result['plan'])}")
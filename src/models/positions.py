@@ -1,72 +1,136 @@
-from typing import Dict
-from .database import get_db_connection, close_db_connection
+from typing import Any, Dict, List, Optional, Sequence
+from .database import db_connection
 
 
-# positions表
-# 表名：positions
-# 字段：question_id，user_id，position
-# position: 字符串类型，用逗号分隔存储用户对各选项的投票数
-# status: progress, ended, expired
-# type: two, multiple
+# position_lines表
+# 表名：position_lines
+# 字段：question_id，user_id，option_index，amount
+# option_index: 选项在问题选项列表中的下标（从0开始）
+# amount: 用户对该选项的持仓数，持仓为0的行会被删除
+# 旧版 positions 表（逗号分隔字符串）由迁移转换为本表
+# 只通过 write_position_lines 在交易或重建流水的事务中写入，保证持仓与投票流水一致
+
+# 批量查询时每条SQL的最大参数个数
+POSITIONS_QUERY_BATCH = 500
 
 def init_positions_table() -> None:
-    """初始化positions表"""
-    conn, cursor = get_db_connection()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS positions (
-            question_id TEXT NOT NULL,
-            user_id TEXT NOT NULL,
-            position TEXT NOT NULL,
-            PRIMARY KEY (question_id, user_id)
-        )
-    ''')
-    conn.commit()
-    close_db_connection(conn)
-
-def get_positions(question_id: str, user_id: str = None) -> Dict[str, str]:
-    """获取指定问题的用户位置信息
+    """初始化position_lines表"""
+    with db_connection() as (conn, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS position_lines (
+                question_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                option_index INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                PRIMARY KEY (question_id, user_id, option_index)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_position_lines_option
+            ON position_lines (question_id, option_index, amount)
+        ''')
+        conn.commit()
+
+def get_positions(question_id: str, user_id: str = None) -> Dict[str, Dict[int, float]]:
+    """获取指定问题的用户持仓信息
 
     Args:
         question_id: 问题ID
-        user_id: 用户ID，如果提供则只返回该用户的位置信息
+        user_id: 用户ID，如果提供则只返回该用户的持仓信息
 
     Returns:
-        Dict[str, str]: 用户ID到位置的映射，位置为逗号分隔的字符串
+        Dict[str, Dict[int, float]]: 用户ID到持仓的映射，持仓为选项下标到持仓数的映射
     """
-    conn, cursor = get_db_connection()
-    if user_id:
-        cursor.execute('''
-            SELECT user_id, position FROM positions WHERE question_id = ? AND user_id = ?
-        ''', (question_id, user_id))
-    else:
-        cursor.execute('''
-            SELECT user_id, position FROM positions WHERE question_id = ?
-        ''', (question_id,))
-    result = {row[0]: row[1] for row in cursor.fetchall()}
-    close_db_connection(conn)
+    with db_connection() as (conn, cursor):
+        if user_id:
+            cursor.execute('''
+                SELECT user_id, option_index, amount FROM position_lines
+                WHERE question_id = ? AND user_id = ?
+            ''', (question_id, user_id))
+        else:
+            cursor.execute('''
+                SELECT user_id, option_index, amount FROM position_lines
+                WHERE question_id = ?
+            ''', (question_id,))
+        rows = cursor.fetchall()
+
+    result: Dict[str, Dict[int, float]] = {}
+    for row_user_id, option_index, amount in rows:
+        result.setdefault(row_user_id, {})[option_index] = amount
     return result
 
-def update_position(question_id: str, user_id: str, position: str) -> None:
-    """更新或插入用户位置信息
+def get_positions_totals(question_ids: Optional[Sequence[str]] = None) -> Dict[str, float]:
+    """批量获取问题的总持仓数
 
     Args:
-        question_id: 问题ID
-        user_id: 用户ID
-        position: 用户投票位置，逗号分隔的字符串，表示对各选项的投票数
+        question_ids: 问题ID列表，为None时返回所有问题
+
+    Returns:
+        Dict[str, float]: 问题ID到所有用户各选项持仓之和的映射，没有持仓的问题不在结果中
+    """
+    with db_connection() as (conn, cursor):
+        if question_ids is None:
+            cursor.execute('''
+                SELECT question_id, SUM(amount) FROM position_lines GROUP BY question_id
+            ''')
+            return dict(cursor.fetchall())
+
+        totals: Dict[str, float] = {}
+        # 分批查询，避免超过SQLite的参数数量上限
+        ids = list(question_ids)
+        for start in range(0, len(ids), POSITIONS_QUERY_BATCH):
+            batch = ids[start:start + POSITIONS_QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(f'''
+                SELECT question_id, SUM(amount) FROM position_lines
+                WHERE question_id IN ({placeholders})
+                GROUP BY question_id
+            ''', batch)
+            totals.update(cursor.fetchall())
+    return totals
+
+def get_option_position_totals(question_id: str) -> Dict[int, float]:
+    """获取问题各选项的总持仓数
+
+    Returns:
+        Dict[int, float]: 选项下标到所有用户持仓之和的映射
+    """
+    with db_connection() as (conn, cursor):
+        cursor.execute('''
+            SELECT option_index, SUM(amount) FROM position_lines
+            WHERE question_id = ?
+            GROUP BY option_index
+        ''', (question_id,))
+        return dict(cursor.fetchall())
+
+def get_position_leaderboard(question_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """获取问题持仓最多的用户
+
+    Returns:
+        List[Dict[str, Any]]: 按总持仓降序排列的用户ID和总持仓
     """
-    conn, cursor = get_db_connection()
-    cursor.execute('''
-        INSERT OR REPLACE INTO positions (question_id, user_id, position)
-        VALUES (?, ?, ?)
-    ''', (question_id, user_id, position))
-    conn.commit()
-    close_db_connection(conn)
-
-def delete_position(question_id: str, user_id: str) -> None:
-    """删除用户位置信息"""
-    conn, cursor = get_db_connection()
-    cursor.execute('''
-        DELETE FROM positions WHERE question_id = ? AND user_id = ?
-    ''', (question_id, user_id))
-    conn.commit()
-    close_db_connection(conn)
\ No newline at end of file
+    with db_connection() as (conn, cursor):
+        cursor.execute('''
+            SELECT user_id, SUM(amount) AS total FROM position_lines
+            WHERE question_id = ?
+            GROUP BY user_id
+            ORDER BY total DESC
+            LIMIT ?
+        ''', (question_id, limit))
+        rows = cursor.fetchall()
+    return [{"user_id": row[0], "total": row[1]} for row in rows]
+
+def write_position_lines(cursor, question_id: str, user_id: str, amounts: Sequence[float]) -> None:
+    """在当前事务中写入用户持仓，持仓为0的选项删除对应行"""
+    cursor.executemany('''
+        INSERT INTO position_lines (question_id, user_id, option_index, amount)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (question_id, user_id, option_index) DO UPDATE SET amount = excluded.amount
+    ''', [
+        (question_id, user_id, i, amount) for i, amount in enumerate(amounts) if amount
+    ])
+    cursor.executemany('''
+        DELETE FROM position_lines WHERE question_id = ? AND user_id = ? AND option_index = ?
+    ''', [
+        (question_id, user_id, i) for i, amount in enumerate(amounts) if not amount
+    ])
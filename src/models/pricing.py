@@ -0,0 +1,136 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+# 概率定价
+# 每个问题的概率是按选项顺序排列的NumPy数组，一次订单是同样长度的带符号数量向量（正数投票，负数撤票）。
+# 订单整体一步生效：按数量调整概率，裁剪到 [MIN_PROBABILITY, MAX_PROBABILITY] 后归一化。
+# 预估结果和实际交易使用同一套计算，保证预估与成交一致。
+#
+# 定价方式（questions.pricing_mode）：
+# linear: 固定步长，每票改变概率 PRICE_STEP，裁剪后归一化
+# lmsr: 对数市场评分规则（LMSR）做市商，问题保存各选项的已发行份额 shares 和流动性参数 b，
+#       价格为 softmax(shares / b)，买入成本为 C(q + Δ) - C(q)，C(q) = b * logsumexp(q / b)。
+#       价格天然在 (0, 1) 内且和为1，不需要裁剪；每次交易只依赖当前份额，与历史长度无关。
+
+PRICING_MODES = ("linear", "lmsr")
+# LMSR 默认流动性参数，越大价格对单笔交易越不敏感
+DEFAULT_LIQUIDITY = 100.0
+
+# 每票改变对应选项概率的幅度
+PRICE_STEP = 0.01
+# 单个选项概率的上下限
+MIN_PROBABILITY = 0.01
+MAX_PROBABILITY = 0.99
+
+
+def apply_changes(probabilities, changes) -> np.ndarray:
+    """将概率变化量向量加到概率上，裁剪后归一化，返回新数组"""
+    probabilities = np.asarray(probabilities, dtype=np.float64) + np.asarray(
+        changes, dtype=np.float64
+    )
+    probabilities = np.clip(probabilities, MIN_PROBABILITY, MAX_PROBABILITY)
+    return probabilities / probabilities.sum()
+
+
+def apply_order(probabilities, amounts) -> np.ndarray:
+    """对一个问题应用一次订单
+
+    Args:
+        probabilities: 当前概率数组
+        amounts: 各选项的带符号数量，正数为投票，负数为撤票
+
+    Returns:
+        np.ndarray: 交易后的概率
+    """
+    return apply_changes(probabilities, np.asarray(amounts, dtype=np.float64) * PRICE_STEP)
+
+
+def order_vector(options: Sequence[str], orders: dict) -> np.ndarray:
+    """将选项到数量的映射转换为按选项顺序排列的数量向量，选项不存在时抛出 KeyError"""
+    index = {option: i for i, option in enumerate(options)}
+    amounts = np.zeros(len(options), dtype=np.float64)
+    for option, amount in orders.items():
+        if option not in index:
+            raise KeyError(option)
+        amounts[index[option]] += amount
+    return amounts
+
+
+def reprice_batch(probabilities_list: Sequence, amounts_list: Sequence) -> List[np.ndarray]:
+    """批量对多个问题应用订单（各问题的选项数可以不同）
+
+    所有问题的概率拼接成一个数组后一次性计算，按问题分段求和归一化。
+
+    Returns:
+        List[np.ndarray]: 与输入顺序对应的交易后概率
+    """
+    if not probabilities_list:
+        return []
+    lengths = np.fromiter((len(p) for p in probabilities_list), dtype=np.intp)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    flat = np.concatenate([np.asarray(p, dtype=np.float64) for p in probabilities_list])
+    flat += np.concatenate([np.asarray(a, dtype=np.float64) for a in amounts_list]) * PRICE_STEP
+    np.clip(flat, MIN_PROBABILITY, MAX_PROBABILITY, out=flat)
+    flat /= np.repeat(np.add.reduceat(flat, offsets), lengths)
+    return np.split(flat, offsets[1:])
+
+
+def logsumexp(values) -> float:
+    """数值稳定的 log(sum(exp(values)))"""
+    values = np.asarray(values, dtype=np.float64)
+    peak = values.max()
+    return float(peak + np.log(np.exp(values - peak).sum()))
+
+
+def lmsr_cost(shares, liquidity: float) -> float:
+    """LMSR 成本函数 C(q) = b * logsumexp(q / b)"""
+    return liquidity * logsumexp(np.asarray(shares, dtype=np.float64) / liquidity)
+
+
+def lmsr_prices(shares, liquidity: float) -> np.ndarray:
+    """LMSR 价格（各选项概率），即 softmax(q / b)"""
+    scaled = np.asarray(shares, dtype=np.float64) / liquidity
+    weights = np.exp(scaled - scaled.max())
+    return weights / weights.sum()
+
+
+def lmsr_initial_shares(probabilities, liquidity: float) -> np.ndarray:
+    """由初始概率反推份额，使 lmsr_prices 等于初始概率（份额整体平移不影响价格，最小值取0）"""
+    shares = liquidity * np.log(np.asarray(probabilities, dtype=np.float64))
+    return shares - shares.min()
+
+
+def lmsr_apply_order(shares, liquidity: float, amounts) -> Tuple[np.ndarray, np.ndarray, float]:
+    """在 LMSR 做市商上执行一次订单
+
+    Args:
+        shares: 当前各选项的已发行份额
+        liquidity: 流动性参数 b
+        amounts: 各选项买入（正数）或卖出（负数）的份额
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, float]: 新份额、新价格、本次订单的成本（卖出时为负）
+    """
+    shares = np.asarray(shares, dtype=np.float64)
+    new_shares = shares + np.asarray(amounts, dtype=np.float64)
+    cost = lmsr_cost(new_shares, liquidity) - lmsr_cost(shares, liquidity)
+    return new_shares, lmsr_prices(new_shares, liquidity), cost
+
+
+def price_order(
+    pricing_mode: str,
+    probabilities,
+    amounts,
+    shares=None,
+    liquidity: Optional[float] = None,
+) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[float]]:
+    """按问题的定价方式执行一次订单
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray], Optional[float]]: 新概率、新份额（仅LMSR）、成本（仅LMSR）
+    """
+    if pricing_mode == "lmsr":
+        new_shares, prices, cost = lmsr_apply_order(shares, liquidity, amounts)
+        return prices, new_shares, cost
+    return apply_order(probabilities, amounts), None, None
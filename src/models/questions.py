@@ -1,42 +1,146 @@
 import sqlite3
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any, List
-from .database import get_db_connection, close_db_connection
-from .config import TZ
+from typing import Optional, Dict, Any, Callable, List, Sequence, Tuple
+from .database import db_connection, record_cas_conflict
+from .cache import get_cache, get_data_version
+from .write_queue import run_write
+from .pricing import DEFAULT_LIQUIDITY, apply_changes, lmsr_initial_shares
+from .config import TZ, CAS_MAX_RETRIES
 import json
+import numpy as np
 
 # 问题表
 # 表名：questions
 # 字段：id，created_at，question，status, type, tags, options, rule, probabilities, created_by, expire_at, result, end_at
 # status: progress, ended, expired
 # type: two, multiple
+# options: JSON数组格式的选项列表（选项中可以包含逗号）
+# probabilities: 按选项顺序排列的float64小端数组（BLOB），读取时直接映射为NumPy数组
+# version: 乐观并发版本号，概率或状态每次变更时加1，写入时比较版本号（compare-and-swap）
+# pricing_mode: 定价方式，linear（固定步长）或 lmsr（对数市场评分规则做市商），见 pricing 模块
+# liquidity: LMSR 流动性参数 b，linear 问题为NULL
+# shares: LMSR 各选项已发行份额，与 probabilities 相同的float64数组BLOB格式，linear 问题为NULL
+
+# 问题快照表
+# 表名：question_snapshots
+# 字段：id，question_id，last_vote_id，version，probabilities，shares，positions，created_at
+# last_vote_id: 快照包含的最后一条投票记录ID，之后的投票记录需要重放
+# positions: 快照时的持仓，JSON数组，每项为 [user_id, option_index, amount]
+
+# 问题标签表
+# 表名：question_tags
+# 字段：question_id，tag
+# 与问题在同一事务中写入和删除，tags 字段保留逗号分隔的原始标签用于展示
+
+
+def encode_options(options: List[str]) -> str:
+    """将选项列表编码为存储格式"""
+    return json.dumps(list(options), ensure_ascii=False)
+
+
+def decode_options(options_json: str) -> List[str]:
+    """将存储格式解码为选项列表"""
+    return json.loads(options_json)
+
+
+def encode_probabilities(probabilities) -> bytes:
+    """将概率编码为float64数组BLOB"""
+    return np.asarray(probabilities, dtype="<f8").tobytes()
+
+
+def decode_probabilities(blob: bytes) -> np.ndarray:
+    """将BLOB解码为NumPy数组（零拷贝只读视图，需修改时请先 copy）"""
+    return np.frombuffer(blob, dtype="<f8")
+
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """将逗号分隔的标签拆分为去重后的标签列表"""
+    if not tags:
+        return []
+    return list(dict.fromkeys(tag.strip() for tag in tags.split(",") if tag.strip()))
+
+
+def write_question_tags(cursor: sqlite3.Cursor, question_id: str, tags: Optional[str]) -> None:
+    """在当前事务中写入问题的标签"""
+    cursor.executemany(
+        "INSERT OR IGNORE INTO question_tags (question_id, tag) VALUES (?, ?)",
+        [(question_id, tag) for tag in split_tags(tags)],
+    )
+
+
+def write_question_snapshot(cursor: sqlite3.Cursor, question_id: str) -> None:
+    """在当前事务中保存问题当前的概率、份额和持仓快照"""
+    cursor.execute(
+        """
+        INSERT INTO question_snapshots (question_id, last_vote_id, version, probabilities, shares, positions)
+        SELECT q.id,
+               COALESCE((SELECT MAX(id) FROM votes WHERE question_id = q.id), 0),
+               q.version, q.probabilities, q.shares,
+               (SELECT json_group_array(json_array(user_id, option_index, amount))
+                FROM position_lines WHERE question_id = q.id)
+        FROM questions q WHERE q.id = ?
+    """,
+        (question_id,),
+    )
 
 
 def init_questions_table():
     """初始化问题表"""
     try:
-        conn, c = get_db_connection()
-        c.execute(
+        with db_connection() as (conn, c):
+            c.execute(
+                """
+                CREATE TABLE IF NOT EXISTS questions (
+                    id TEXT PRIMARY KEY,
+                    created_at TIMESTAMP NOT NULL,
+                    question TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    tags TEXT,
+                    options TEXT NOT NULL,
+                    probabilities BLOB NOT NULL,
+                    rule TEXT,
+                    created_by TEXT NOT NULL,
+                    expire_at TIMESTAMP NOT NULL,
+                    result TEXT,
+                    end_at TIMESTAMP,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    pricing_mode TEXT NOT NULL DEFAULT 'linear',
+                    liquidity REAL,
+                    shares BLOB
+                )
             """
-            CREATE TABLE IF NOT EXISTS questions (
-                id TEXT PRIMARY KEY,
-                created_at TIMESTAMP NOT NULL,
-                question TEXT NOT NULL,
-                status TEXT NOT NULL,
-                type TEXT NOT NULL,
-                tags TEXT,
-                options TEXT NOT NULL,
-                probabilities TEXT NOT NULL,
-                rule TEXT,
-                created_by TEXT NOT NULL,
-                expire_at TIMESTAMP NOT NULL,
-                result TEXT,
-                end_at TIMESTAMP
             )
-        """
-        )
-        conn.commit()
-        close_db_connection(conn)
+            c.execute(
+                """
+                CREATE TABLE IF NOT EXISTS question_tags (
+                    question_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (tag, question_id)
+                ) WITHOUT ROWID
+            """
+            )
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS idx_question_tags_question ON question_tags (question_id)"
+            )
+            c.execute(
+                """
+                CREATE TABLE IF NOT EXISTS question_snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    question_id TEXT NOT NULL,
+                    last_vote_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    probabilities BLOB NOT NULL,
+                    shares BLOB,
+                    positions TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS idx_question_snapshots_question ON question_snapshots (question_id, last_vote_id)"
+            )
+            conn.commit()
         return True
     except Exception as e:
         print(f"Error initializing questions table: {e}")
@@ -45,15 +149,24 @@ def init_questions_table():
 
 def create_question(question_data: Dict[str, Any]) -> bool:
     """创建新问题"""
-    try:
-        conn, c = get_db_connection()
+    # LMSR 问题由初始概率反推初始份额
+    pricing_mode = question_data.get("pricing_mode", "linear")
+    liquidity = None
+    shares = None
+    if pricing_mode == "lmsr":
+        liquidity = float(question_data.get("liquidity") or DEFAULT_LIQUIDITY)
+        shares = encode_probabilities(
+            lmsr_initial_shares(question_data["probabilities"], liquidity)
+        )
+
+    def write(c):
         c.execute(
             """
             INSERT INTO questions (
                 id, created_at, question, status, type, tags,
                 options, probabilities, rule, created_by,
-                expire_at, result, end_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                expire_at, result, end_at, pricing_mode, liquidity, shares
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
             (
                 question_data["id"],
@@ -62,17 +175,24 @@ def create_question(question_data: Dict[str, Any]) -> bool:
                 question_data["status"],
                 question_data["type"],
                 question_data["tags"],
-                question_data["options"],
-                question_data["probabilities"],
+                encode_options(question_data["options"]),
+                encode_probabilities(question_data["probabilities"]),
                 question_data["rule"],
                 question_data["created_by"],
                 question_data["expire_at"],
                 question_data["result"],
                 question_data["end_at"],
+                pricing_mode,
+                liquidity,
+                shares,
             ),
         )
-        conn.commit()
-        close_db_connection(conn)
+        write_question_tags(c, question_data["id"], question_data["tags"])
+        # 初始快照，重放交易流水的起点
+        write_question_snapshot(c, question_data["id"])
+
+    try:
+        run_write(write)
         return True
     except Exception as e:
         print(f"Error creating question: {e}")
@@ -81,9 +201,7 @@ def create_question(question_data: Dict[str, Any]) -> bool:
 
 def end_question(question_id: str, result: Dict[str, Any], end_by: str) -> bool:
     """结束问题"""
-    try:
-        conn, c = get_db_connection()
-
+    def write(c):
         # 验证问题是否存在且由当前用户创建
         c.execute("SELECT created_by FROM questions WHERE id = ?", (question_id,))
         question_data = c.fetchone()
@@ -98,133 +216,326 @@ def end_question(question_id: str, result: Dict[str, Any], end_by: str) -> bool:
             UPDATE questions
             SET status = 'ended',
                 result = ?,
-                end_at = CURRENT_TIMESTAMP
+                end_at = CURRENT_TIMESTAMP,
+                version = version + 1
             WHERE id = ?
         """,
             (json.dumps(simplified_result), question_id),
         )
-        conn.commit()
-        close_db_connection(conn)
         return True
+
+    try:
+        return run_write(write)
     except Exception as e:
         print(f"Error ending question: {e}")
         return False
 
 
-def check_expired_questions() -> bool:
-    """检查并处理过期问题"""
-    try:
-        conn, c = get_db_connection()
+def parse_expire_at(value: str) -> datetime:
+    """解析过期时间，不带时区的时间按平台时区处理"""
+    expire_at = datetime.fromisoformat(value)
+    if expire_at.tzinfo is None:
+        expire_at = expire_at.replace(tzinfo=TZ)
+    return expire_at
 
-        # 更新过期问题的状态
-        c.execute(
+
+def load_pending_expiries() -> Tuple[int, List[Tuple[str, datetime]]]:
+    """读取所有进行中问题的过期时间及对应的变更计数（question_lifecycle）"""
+    def read(c):
+        c.execute("SELECT id, expire_at FROM questions WHERE status = 'progress'")
+        return [(question_id, parse_expire_at(expire_at)) for question_id, expire_at in c.fetchall()]
+
+    return _read_snapshot(read, "question_lifecycle")
+
+
+def expire_questions(question_ids: Sequence[str]) -> int:
+    """将指定问题标记为过期，只更新仍在进行中的问题
+
+    Returns:
+        int: 实际过期的问题数
+    """
+    if not question_ids:
+        return 0
+
+    def write(c):
+        c.executemany(
             """
             UPDATE questions
             SET status = 'expired',
                 result = ?,
-                end_at = CURRENT_TIMESTAMP
-            WHERE status = 'progress'
-            AND expire_at < CURRENT_TIMESTAMP
+                end_at = CURRENT_TIMESTAMP,
+                version = version + 1
+            WHERE id = ? AND status = 'progress'
         """,
-            (json.dumps({"status": "expired"}),),
+            [(json.dumps({"status": "expired"}), question_id) for question_id in question_ids],
         )
+        return c.rowcount
+
+    return run_write(write)
+
 
-        conn.commit()
-        close_db_connection(conn)
+def check_expired_questions() -> bool:
+    """检查并处理过期问题（一次性扫描，常驻进程中由过期调度器按时处理）"""
+    try:
+        now = datetime.now(TZ)
+        _, pending = load_pending_expiries()
+        expire_questions([question_id for question_id, expire_at in pending if expire_at <= now])
         return True
     except Exception as e:
         print(f"Error checking expired questions: {e}")
         return False
 
 
+def compare_and_set_probabilities(
+    cursor: sqlite3.Cursor, question_id: str, expected_version: int, probabilities, shares=None
+) -> bool:
+    """在当前事务中写入概率（LMSR问题同时写入份额），仅当版本号未被其他写入修改时成功"""
+    if shares is None:
+        cursor.execute(
+            """
+            UPDATE questions
+            SET probabilities = ?, version = version + 1
+            WHERE id = ? AND version = ?
+        """,
+            (encode_probabilities(probabilities), question_id, expected_version),
+        )
+    else:
+        cursor.execute(
+            """
+            UPDATE questions
+            SET probabilities = ?, shares = ?, version = version + 1
+            WHERE id = ? AND version = ?
+        """,
+            (
+                encode_probabilities(probabilities),
+                encode_probabilities(shares),
+                question_id,
+                expected_version,
+            ),
+        )
+    return cursor.rowcount == 1
+
+
 def update_question_probabilities(
     question_id: str, option: str, probability_change: float
 ) -> bool:
-    """更新问题概率"""
-    conn = None
+    """更新问题概率
+
+    在写事务外读取并计算新概率，写入时比较版本号，冲突时重新读取并重试。
+    """
     try:
-        conn, c = get_db_connection()
+        for _ in range(CAS_MAX_RETRIES):
+            # 获取当前问题的概率、选项和版本号
+            with db_connection() as (conn, c):
+                c.execute(
+                    """SELECT probabilities, options, version, pricing_mode, liquidity
+                       FROM questions WHERE id = ?""",
+                    (question_id,),
+                )
+                result = c.fetchone()
+            if not result:
+                return False
+
+            current_probabilities, options_json, version, pricing_mode, liquidity = result
+            probabilities = decode_probabilities(current_probabilities)
+            options = decode_options(options_json)
+
+            # 验证选项是否存在
+            try:
+                option_index = options.index(option)
+            except ValueError:
+                return False
+
+            # 更新概率，裁剪到有效范围后归一化
+            changes = np.zeros(len(probabilities))
+            changes[option_index] = probability_change
+            probabilities = apply_changes(probabilities, changes)
+            # LMSR 问题按新概率重新设定份额
+            shares = lmsr_initial_shares(probabilities, liquidity) if pricing_mode == "lmsr" else None
+
+            # 保存更新后的概率
+            def write(c):
+                if not compare_and_set_probabilities(c, question_id, version, probabilities, shares):
+                    return False
+                # 直接修改概率不经过交易流水，保存快照作为之后重放的起点
+                write_question_snapshot(c, question_id)
+                return True
+
+            if run_write(write):
+                return True
+            record_cas_conflict()
+        print(f"Error updating probabilities: too many concurrent updates on {question_id}")
+        return False
+    except Exception as e:
+        print(f"Error updating probabilities: {e}")
+        return False
 
-        # 获取当前问题的概率和选项
-        c.execute(
-            "SELECT probabilities, options FROM questions WHERE id = ?", (question_id,)
-        )
-        result = c.fetchone()
-        if not result:
-            return False
 
-        current_probabilities, options_str = result
-        probabilities = [float(p) for p in current_probabilities.split(",")]
-        options = options_str.split(",")
+# 问题查询的列，与 _row_to_question 的字段顺序对应
+QUESTION_COLUMNS = "id, created_at, question, status, type, tags, options, probabilities, rule, created_by, expire_at, result, end_at, version, pricing_mode, liquidity, shares"
+
+# 问题列表可用的排序字段
+QUESTION_SORT_COLUMNS = {"created_at": "created_at", "expire_at": "expire_at"}
+
+
+def _row_to_question(q) -> Dict[str, Any]:
+    """将查询结果行转换为问题字典"""
+    return {
+        "id": q[0],
+        "created_at": datetime.fromisoformat(q[1]).astimezone(TZ).isoformat(),
+        "question": q[2],
+        "status": q[3],
+        "type": q[4],
+        "tags": q[5],
+        "options": decode_options(q[6]),
+        "probabilities": decode_probabilities(q[7]),
+        "rule": q[8],
+        "created_by": q[9],
+        # 与过期调度一致：不带时区的过期时间按平台时区处理
+        "expire_at": parse_expire_at(q[10]).isoformat() if q[10] else None,
+        "result": q[11],
+        "end_at": (
+            datetime.fromisoformat(q[12]).astimezone(TZ).isoformat()
+            if q[12]
+            else None
+        ),
+        "version": q[13],
+        "pricing_mode": q[14],
+        "liquidity": q[15],
+        "shares": decode_probabilities(q[16]) if q[16] is not None else None,
+    }
+
+
+def _read_snapshot(read: Callable[[sqlite3.Cursor], Any], counter: str = "questions") -> Tuple[int, Any]:
+    """在同一个读快照中读取指定的变更计数和数据"""
+    with db_connection() as (conn, c):
+        snapshot = not conn.in_transaction
+        if snapshot:
+            c.execute("BEGIN")
+        c.execute("SELECT seq FROM change_counters WHERE name = ?", (counter,))
+        row = c.fetchone()
+        value = read(c)
+        if snapshot:
+            conn.rollback()
+    return row[0] if row else 0, value
 
-        # 验证选项是否存在
-        try:
-            option_index = options.index(option)
-        except ValueError:
-            return False
 
-        # 更新概率
-        probabilities[option_index] += probability_change
+def _load_questions() -> Tuple[int, List[Dict[str, Any]]]:
+    """读取所有问题及对应的变更计数"""
+    def read(c):
+        c.execute(f"SELECT {QUESTION_COLUMNS} FROM questions")
+        return [_row_to_question(q) for q in c.fetchall()]
+
+    return _read_snapshot(read)
+
+
+def _load_tag_facets() -> Tuple[int, Dict[str, int]]:
+    """读取各标签的问题数及对应的变更计数（question_set）"""
+    def read(c):
+        c.execute("SELECT tag, COUNT(*) FROM question_tags GROUP BY tag")
+        facets = sorted(c.fetchall(), key=lambda row: (-row[1], row[0]))
+        return dict(facets)
+
+    return _read_snapshot(read, "question_set")
+
+
+def get_question(question_id: str) -> Optional[Dict[str, Any]]:
+    """获取单个问题，不存在时返回None"""
+    with db_connection() as (conn, c):
+        c.execute(f"SELECT {QUESTION_COLUMNS} FROM questions WHERE id = ?", (question_id,))
+        row = c.fetchone()
+    return _row_to_question(row) if row else None
+
+
+def list_questions() -> List[Dict[str, Any]]:
+    """获取所有问题列表
+
+    结果在进程内缓存，问题表的变更计数未变化时直接返回缓存（所有会话共享）。
+    返回的每个问题都是浅拷贝，probabilities 为只读数组。
+    """
+    questions = get_cache("questions").get(
+        "all", get_data_version("questions"), _load_questions
+    )
+    return [dict(q) for q in questions]
+
 
-        # 确保概率在有效范围内
-        probabilities = [max(0.01, min(0.99, p)) for p in probabilities]
+def query_questions(
+    status: Optional[str] = None,
+    tags: Optional[Sequence[str]] = None,
+    created_by: Optional[str] = None,
+    order_by: str = "created_at",
+    descending: bool = True,
+    limit: int = 50,
+    cursor: Optional[Tuple[Any, str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, str]]]:
+    """按条件分页查询问题（筛选和排序在SQL中完成，使用游标分页）
 
-        # 归一化概率
-        total = sum(probabilities)
-        probabilities = [p / total for p in probabilities]
+    Args:
+        status: 状态筛选，None表示全部
+        tags: 标签筛选，包含任意一个标签的问题都会返回
+        created_by: 创建者筛选
+        order_by: 排序字段，created_at 或 expire_at
+        descending: 是否降序
+        limit: 每页数量
+        cursor: 上一页返回的游标，None表示第一页
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[Tuple[Any, str]]]: 本页问题和下一页游标，没有下一页时游标为None
+    """
+    column = QUESTION_SORT_COLUMNS.get(order_by)
+    if column is None:
+        raise ValueError(f"Unsupported order_by: {order_by}")
+    direction = "DESC" if descending else "ASC"
+
+    conditions = []
+    params: List[Any] = []
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if created_by:
+        conditions.append("created_by = ?")
+        params.append(created_by)
+    if tags:
+        placeholders = ",".join("?" * len(tags))
+        conditions.append(
+            f"id IN (SELECT question_id FROM question_tags WHERE tag IN ({placeholders}))"
+        )
+        params.extend(tags)
+    if cursor is not None:
+        conditions.append(f"({column}, id) {'<' if descending else '>'} (?, ?)")
+        params.extend(cursor)
 
-        # 保存更新后的概率
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with db_connection() as (conn, c):
         c.execute(
-            "UPDATE questions SET probabilities = ? WHERE id = ?",
-            (",".join(str(p) for p in probabilities), question_id),
+            f"""
+            SELECT {QUESTION_COLUMNS} FROM questions
+            {where}
+            ORDER BY {column} {direction}, id {direction}
+            LIMIT ?
+        """,
+            (*params, limit + 1),
         )
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"Error updating probabilities: {e}")
-        if conn:
-            conn.rollback()
-        return False
-    finally:
-        if conn:
-            close_db_connection(conn)
+        rows = c.fetchall()
 
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = (last[1] if column == "created_at" else last[10], last[0])
+    return [_row_to_question(q) for q in rows], next_cursor
 
-def list_questions() -> List[Dict[str, Any]]:
-    """获取所有问题列表"""
-    conn, c = get_db_connection()
-    c.execute(
-        "SELECT id, created_at, question, status, type, tags, options, probabilities, rule, created_by, expire_at, result, end_at FROM questions"
+
+def get_tag_facets() -> Dict[str, int]:
+    """获取各标签的问题数，按问题数降序排列
+
+    结果在进程内缓存，问题表的变更计数未变化时直接返回缓存。
+    """
+    facets = get_cache("tag_facets").get(
+        "all", get_data_version("question_set"), _load_tag_facets
     )
-    questions = c.fetchall()
-    close_db_connection(conn)
-
-    return [
-        {
-            "id": q[0],
-            "created_at": datetime.fromisoformat(q[1]).astimezone(TZ).isoformat(),
-            "question": q[2],
-            "status": q[3],
-            "type": q[4],
-            "tags": q[5],
-            "options": q[6],
-            "probabilities": q[7],
-            "rule": q[8],
-            "created_by": q[9],
-            "expire_at": (
-                datetime.fromisoformat(q[10]).astimezone(TZ).isoformat()
-                if q[10]
-                else None
-            ),
-            "result": q[11],
-            "end_at": (
-                datetime.fromisoformat(q[12]).astimezone(TZ).isoformat()
-                if q[12]
-                else None
-            ),
-        }
-        for q in questions
-    ]
+    return dict(facets)
 
 
 def delete_question(question_id: str, username: str) -> bool:
@@ -237,10 +548,7 @@ def delete_question(question_id: str, username: str) -> bool:
     Returns:
         bool: 删除是否成功
     """
-    conn = None
-    try:
-        conn, c = get_db_connection()
-
+    def write(c):
         # 验证问题是否存在且由当前用户创建
         c.execute("SELECT created_by FROM questions WHERE id = ?", (question_id,))
         question_data = c.fetchone()
@@ -251,26 +559,26 @@ def delete_question(question_id: str, username: str) -> bool:
         if question_data[0] != username:
             return False
 
-        # 开始事务
-        conn.execute("BEGIN TRANSACTION")
+        # 先删除问题，投票流水只有在问题删除后才允许删除
+        c.execute("DELETE FROM questions WHERE id = ?", (question_id,))
 
         # 删除相关的投票数据
         c.execute("DELETE FROM votes WHERE question_id = ?", (question_id,))
 
         # 删除相关的仓位数据
-        c.execute("DELETE FROM positions WHERE question_id = ?", (question_id,))
+        c.execute("DELETE FROM position_lines WHERE question_id = ?", (question_id,))
 
-        # 删除问题
-        c.execute("DELETE FROM questions WHERE id = ?", (question_id,))
+        # 删除问题标签和快照
+        c.execute("DELETE FROM question_tags WHERE question_id = ?", (question_id,))
+        c.execute("DELETE FROM question_snapshots WHERE question_id = ?", (question_id,))
 
-        # 提交事务
-        conn.commit()
+        # 删除概率时间序列汇总和选项票数汇总
+        c.execute("DELETE FROM price_rollups WHERE question_id = ?", (question_id,))
+        c.execute("DELETE FROM option_totals WHERE question_id = ?", (question_id,))
         return True
+
+    try:
+        return run_write(write)
     except Exception as e:
         print(f"Error deleting question: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            close_db_connection(conn)
@@ -0,0 +1,197 @@
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .database import db_connection, transaction
+from .ledger import replay_on_cursor
+
+# 概率时间序列汇总表
+# 表名：price_rollups
+# 字段：question_id，resolution，bucket，option_index，open，high，low，close，trades
+# resolution: 汇总粒度，minute / hour / day
+# bucket: 时间桶起点的Unix时间戳（秒，UTC）
+# open/high/low/close: 桶内该选项概率的开盘、最高、最低、收盘值
+# trades: 桶内的交易笔数
+# 每次交易在同一事务中更新三个粒度的汇总行，也可以由交易流水重放重建
+
+# 汇总粒度及其桶长度（秒），从细到粗
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# 图表默认最多显示的点数
+DEFAULT_MAX_POINTS = 500
+
+# 选择汇总粒度时，每个选项最多读取的桶数（超过时使用更粗的粒度，再用LTTB降采样）
+MAX_BUCKETS_PER_QUERY = 5000
+
+
+def record_trade_prices(
+    cursor, question_id: str, timestamp: float, probabilities
+) -> None:
+    """在当前事务中把一笔交易后的概率计入各粒度的汇总"""
+    rows = []
+    for resolution, seconds in RESOLUTIONS.items():
+        bucket = int(timestamp // seconds * seconds)
+        for option_index, probability in enumerate(np.asarray(probabilities).tolist()):
+            rows.append((question_id, resolution, bucket, option_index, probability))
+    cursor.executemany(
+        """
+        INSERT INTO price_rollups (question_id, resolution, bucket, option_index, open, high, low, close, trades)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?5, ?5, ?5, 1)
+        ON CONFLICT (question_id, resolution, bucket, option_index) DO UPDATE SET
+            high = max(high, excluded.high),
+            low = min(low, excluded.low),
+            close = excluded.close,
+            trades = trades + 1
+    """,
+        rows,
+    )
+
+
+def _parse_vote_time(created_at: str) -> float:
+    """将投票记录的时间（CURRENT_TIMESTAMP，UTC）转换为Unix时间戳"""
+    value = datetime.fromisoformat(created_at)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def rebuild_rollups_on_cursor(cursor, question_id: str) -> bool:
+    """在当前事务中由最早快照开始重放交易流水，重建问题的概率汇总"""
+    trades: List[Tuple[float, np.ndarray]] = []
+    state = replay_on_cursor(
+        cursor,
+        question_id,
+        on_trade=lambda created_at, probabilities: trades.append(
+            (_parse_vote_time(created_at), probabilities)
+        ),
+        from_first_snapshot=True,
+    )
+    if state is None:
+        return False
+    cursor.execute("DELETE FROM price_rollups WHERE question_id = ?", (question_id,))
+    for timestamp, probabilities in trades:
+        record_trade_prices(cursor, question_id, timestamp, probabilities)
+    return True
+
+
+def rebuild_price_rollups(question_id: str) -> bool:
+    """由交易流水重建问题的概率汇总"""
+    try:
+        with transaction() as (conn, c):
+            return rebuild_rollups_on_cursor(c, question_id)
+    except Exception as e:
+        print(f"Error rebuilding price rollups: {e}")
+        return False
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的下标（包含首尾点）"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # 首尾点之外的点均分为 threshold - 2 个桶
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # 下一个桶的平均点（最后一个桶使用尾点）
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # 选择与上一个选中点、下一个桶平均点构成最大三角形面积的点
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def _choose_resolution(c, question_id: str) -> Optional[str]:
+    """选择桶数不超过上限的最细粒度"""
+    c.execute(
+        """SELECT MIN(bucket), MAX(bucket) FROM price_rollups
+           WHERE question_id = ? AND resolution = 'day'""",
+        (question_id,),
+    )
+    first, last = c.fetchone()
+    if first is None:
+        return None
+    span = last - first + RESOLUTIONS["day"]
+    for resolution, seconds in RESOLUTIONS.items():
+        if span / seconds <= MAX_BUCKETS_PER_QUERY:
+            return resolution
+    return "day"
+
+
+def _empty_history(resolution: Optional[str]) -> Dict[str, object]:
+    """没有交易记录时的概率历史"""
+    return {"resolution": resolution, "timestamps": np.empty(0), "probabilities": np.empty((0, 0))}
+
+
+def get_price_history(
+    question_id: str,
+    max_points: int = DEFAULT_MAX_POINTS,
+    resolution: Optional[str] = None,
+) -> Dict[str, object]:
+    """获取问题各选项的概率历史（收盘价），点数不超过 max_points
+
+    Args:
+        question_id: 问题ID
+        max_points: 每个选项最多返回的点数
+        resolution: 指定汇总粒度，None表示按时间跨度自动选择
+
+    Returns:
+        Dict[str, object]: resolution 使用的粒度，timestamps 时间桶起点（Unix时间戳数组），
+            probabilities 形状为 (点数, 选项数) 的概率数组，列与问题的选项一一对应；
+            桶内没有记录的选项沿用之前的概率，第一次出现之前为NaN；没有交易时 timestamps 为空数组
+    """
+    with db_connection() as (conn, c):
+        c.execute("SELECT options FROM questions WHERE id = ?", (question_id,))
+        row = c.fetchone()
+        if row is None:
+            return _empty_history(None)
+        option_count = len(json.loads(row[0]))
+        if resolution is None:
+            resolution = _choose_resolution(c, question_id)
+        if resolution is None:
+            return _empty_history(None)
+        c.execute(
+            """SELECT bucket, option_index, close FROM price_rollups
+               WHERE question_id = ? AND resolution = ? AND option_index < ?
+               ORDER BY bucket, option_index""",
+            (question_id, resolution, option_count),
+        )
+        rows = np.array(c.fetchall(), dtype=np.float64).reshape(-1, 3)
+    if not len(rows):
+        return _empty_history(resolution)
+
+    buckets, bucket_index = np.unique(rows[:, 0], return_inverse=True)
+    probabilities = np.full((len(buckets), option_count), np.nan)
+    probabilities[bucket_index, rows[:, 1].astype(np.intp)] = rows[:, 2]
+
+    # 迁移回填的汇总只包含桶内成交的选项，缺失的值用该选项上一个有记录的桶向前填充
+    last_seen = np.where(np.isnan(probabilities), 0, np.arange(len(buckets))[:, None])
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+    probabilities = probabilities[last_seen, np.arange(option_count)]
+
+    # 每个选项分别降采样到 max_points / 选项数 个点，合并保留的时间点（总点数不超过 max_points）
+    if len(buckets) > max_points:
+        threshold = max(3, max_points // option_count)
+        keep = np.unique(
+            np.concatenate(
+                [lttb(buckets, probabilities[:, i], threshold) for i in range(option_count)]
+            )
+        )
+        buckets = buckets[keep]
+        probabilities = probabilities[keep]
+
+    return {"resolution": resolution, "timestamps": buckets, "probabilities": probabilities}
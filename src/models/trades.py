@@ -0,0 +1,207 @@
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from .database import db_connection, record_cas_conflict
+from .ledger import maybe_snapshot
+from .positions import write_position_lines
+from .pricing import order_vector, price_order
+from .questions import decode_options, decode_probabilities, compare_and_set_probabilities
+from .timeseries import record_trade_prices
+from .votes import add_option_totals
+from .write_queue import run_write
+
+# 交易：一次操作中对多个选项的投票/撤票
+# 概率、持仓和投票记录在同一个 BEGIN IMMEDIATE 事务中更新，只提交一次
+# （开启写入队列时与其他写入合并在同一批次中提交）
+# 概率写入使用问题版本号做乐观并发控制，写锁只在写入阶段持有
+# 每次交易的投票记录共用一个 trade_id，追加到只追加的交易流水中（见 ledger 模块）
+
+
+# 单笔交易中每个选项最多投票的数量（与投票页面的输入上限一致），撤票数量受持有量限制
+MAX_ORDER_AMOUNT = 100.0
+
+
+class TradeError(Exception):
+    """交易校验失败"""
+
+
+_trade_stats = {
+    "trades": 0,
+    "failures": 0,
+    "latency_ms_total": 0.0,
+    "latency_ms_max": 0.0,
+}
+_trade_stats_lock = threading.Lock()
+
+
+def _record_trade(latency_ms: float, success: bool) -> None:
+    """记录交易提交耗时"""
+    with _trade_stats_lock:
+        if success:
+            _trade_stats["trades"] += 1
+            _trade_stats["latency_ms_total"] += latency_ms
+            _trade_stats["latency_ms_max"] = max(_trade_stats["latency_ms_max"], latency_ms)
+        else:
+            _trade_stats["failures"] += 1
+
+
+def get_trade_stats() -> Dict[str, Any]:
+    """获取交易提交耗时统计"""
+    with _trade_stats_lock:
+        stats = dict(_trade_stats)
+    stats["latency_ms_avg"] = (
+        stats["latency_ms_total"] / stats["trades"] if stats["trades"] else 0.0
+    )
+    return stats
+
+
+def _read_trade_state(c, question_id: str, username: str) -> Dict[str, Any]:
+    """读取交易所需的问题状态和用户持仓"""
+    c.execute(
+        """SELECT status, options, probabilities, version, pricing_mode, liquidity, shares
+           FROM questions WHERE id = ?""",
+        (question_id,),
+    )
+    row = c.fetchone()
+    if not row:
+        raise TradeError("问题不存在")
+    status, options_json, probabilities_blob, version, pricing_mode, liquidity, shares_blob = row
+    if status != "progress":
+        raise TradeError("问题已结束，无法交易")
+
+    c.execute(
+        """SELECT option_index, amount FROM position_lines
+           WHERE question_id = ? AND user_id = ?""",
+        (question_id, username),
+    )
+    return {
+        "options": options_json,
+        "probabilities": probabilities_blob,
+        "version": version,
+        "pricing_mode": pricing_mode,
+        "liquidity": liquidity,
+        "shares": shares_blob,
+        "holdings": dict(c.fetchall()),
+    }
+
+
+class TradePlan(NamedTuple):
+    """交易计算结果"""
+
+    probabilities: np.ndarray
+    shares: Optional[np.ndarray]
+    cost: Optional[float]
+    amounts: List[float]
+    votes: List[Tuple]
+
+
+def _plan_trade(
+    question_id: str,
+    username: str,
+    trade_id: str,
+    state: Dict[str, Any],
+    orders: Dict[str, float],
+) -> TradePlan:
+    """根据当前状态计算交易后的概率、份额、成本、持仓和投票记录"""
+    options = decode_options(state["options"])
+    try:
+        order = order_vector(options, orders)
+    except KeyError as e:
+        raise TradeError(f"选项 {e.args[0]} 不存在")
+    if not np.isfinite(order).all():
+        raise TradeError("投票或撤票数量必须是有限数值")
+    excess = np.flatnonzero(order > MAX_ORDER_AMOUNT)
+    if excess.size:
+        raise TradeError(f"选项 {options[excess[0]]} 的投票数量不能超过 {MAX_ORDER_AMOUNT:g}")
+
+    holdings = np.array([state["holdings"].get(i, 0.0) for i in range(len(options))])
+    remaining = holdings + order
+    # 撤完全部持仓时消除浮点误差，持仓为0的行会被删除
+    remaining[np.abs(remaining) < 1e-9] = 0.0
+    shortfall = np.flatnonzero(remaining < 0)
+    if shortfall.size:
+        raise TradeError(f"撤票数量不能超过持有量 {holdings[shortfall[0]]:.1f}")
+
+    traded = np.flatnonzero(order)
+    if not traded.size:
+        raise TradeError("请输入投票或撤票数量")
+
+    # 整个订单一步定价
+    probabilities, shares, cost = price_order(
+        state["pricing_mode"],
+        decode_probabilities(state["probabilities"]),
+        order,
+        shares=decode_probabilities(state["shares"]) if state["shares"] is not None else None,
+        liquidity=state["liquidity"],
+    )
+    votes = [
+        (question_id, username, float(order[i]), options[i], float(probabilities[i]), trade_id, int(i))
+        for i in traded
+    ]
+    return TradePlan(probabilities, shares, cost, remaining.tolist(), votes)
+
+
+def execute_trade(question_id: str, username: str, orders: Dict[str, float]) -> Dict[str, Any]:
+    """在单个写事务中执行一次交易
+
+    在写事务外读取问题状态并计算交易结果，写事务内只比较版本号和持仓后写入；
+    若期间被并发修改，则在写事务内基于最新状态重新计算，不需要再次往返。
+
+    Args:
+        question_id: 问题ID
+        username: 用户名
+        orders: 选项到带符号数量的映射，正数为投票，负数为撤票
+
+    Returns:
+        Dict[str, Any]: success 是否成功，message 失败原因，
+            probabilities 交易后的概率，cost 本次交易的成本（仅LMSR问题，其他为None），
+            latency_ms 事务（含提交）耗时
+    """
+    try:
+        with db_connection() as (conn, c):
+            state = _read_trade_state(c, question_id, username)
+        trade_id = uuid.uuid4().hex
+        plan = _plan_trade(question_id, username, trade_id, state, orders)
+
+        def write(c):
+            current = _read_trade_state(c, question_id, username)
+            trade_plan = plan
+            if current["version"] != state["version"] or current["holdings"] != state["holdings"]:
+                record_cas_conflict()
+                trade_plan = _plan_trade(question_id, username, trade_id, current, orders)
+            if not compare_and_set_probabilities(
+                c, question_id, current["version"], trade_plan.probabilities, trade_plan.shares
+            ):
+                raise TradeError("当前交易过于频繁，请稍后重试")
+            write_position_lines(c, question_id, username, trade_plan.amounts)
+            c.executemany(
+                """INSERT INTO votes (question_id, username, vote, option, probability, trade_id, option_index)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                trade_plan.votes,
+            )
+            add_option_totals(c, question_id, [(vote[6], vote[2]) for vote in trade_plan.votes])
+            record_trade_prices(c, question_id, time.time(), trade_plan.probabilities)
+            maybe_snapshot(c, question_id)
+            return trade_plan
+
+        start = time.perf_counter()
+        trade_plan = run_write(write)
+    except TradeError as e:
+        _record_trade(0.0, False)
+        return {"success": False, "message": str(e)}
+    except Exception as e:
+        print(f"Error executing trade: {e}")
+        _record_trade(0.0, False)
+        return {"success": False, "message": "交易失败，请稍后重试"}
+
+    latency_ms = (time.perf_counter() - start) * 1000
+    _record_trade(latency_ms, True)
+    return {
+        "success": True,
+        "message": "",
+        "probabilities": trade_plan.probabilities,
+        "cost": trade_plan.cost,
+        "latency_ms": latency_ms,
+    }
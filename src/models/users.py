@@ -1,7 +1,7 @@
 import sqlite3
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any, List
-from .database import get_db_connection, close_db_connection
+from .database import db_connection, transaction
 from .config import TZ
 
 # 用户信息表
@@ -13,24 +13,23 @@ from .config import TZ
 def init_users_table():
     """初始化用户表"""
     try:
-        conn, c = get_db_connection()
-        # 检查表是否存在
-        c.execute(
-            """SELECT count(name) FROM sqlite_master WHERE type='table' AND name='users' """
-        )
-
-        if c.fetchone()[0] == 0:
+        with db_connection() as (conn, c):
+            # 检查表是否存在
             c.execute(
-                """CREATE TABLE users
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                          username TEXT UNIQUE NOT NULL,
-                          password TEXT NOT NULL,
-                          vote INTEGER DEFAULT 0,
-                          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                          role TEXT DEFAULT 'user')"""
+                """SELECT count(name) FROM sqlite_master WHERE type='table' AND name='users' """
             )
-            conn.commit()
-        close_db_connection(conn)
+
+            if c.fetchone()[0] == 0:
+                c.execute(
+                    """CREATE TABLE users
+                             (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              username TEXT UNIQUE NOT NULL,
+                              password TEXT NOT NULL,
+                              vote INTEGER DEFAULT 0,
+                              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                              role TEXT DEFAULT 'user')"""
+                )
+                conn.commit()
         return True
     except Exception as e:
         print(f"Error initializing users table: {e}")
@@ -40,13 +39,11 @@ def init_users_table():
 def create_user(username: str, password: str, role: str = "user") -> bool:
     """创建新用户"""
     try:
-        conn, c = get_db_connection()
-        c.execute(
-            "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-            (username, password, role),
-        )
-        conn.commit()
-        close_db_connection(conn)
+        with transaction() as (conn, c):
+            c.execute(
+                "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                (username, password, role),
+            )
         return True
     except sqlite3.IntegrityError:
         return False
@@ -54,13 +51,12 @@ def create_user(username: str, password: str, role: str = "user") -> bool:
 
 def get_user(username: str) -> Optional[Dict[str, Any]]:
     """获取用户信息"""
-    conn, c = get_db_connection()
-    c.execute(
-        "SELECT id, username, password, vote, created_at, role FROM users WHERE username = ?",
-        (username,),
-    )
-    user = c.fetchone()
-    close_db_connection(conn)
+    with db_connection() as (conn, c):
+        c.execute(
+            "SELECT id, username, password, vote, created_at, role FROM users WHERE username = ?",
+            (username,),
+        )
+        user = c.fetchone()
 
     if user:
         return {
@@ -77,13 +73,11 @@ def get_user(username: str) -> Optional[Dict[str, Any]]:
 def update_user_vote(username: str, vote_delta: int) -> bool:
     """更新用户投票数"""
     try:
-        conn, c = get_db_connection()
-        c.execute(
-            "UPDATE users SET vote = vote + ? WHERE username = ?",
-            (vote_delta, username),
-        )
-        conn.commit()
-        close_db_connection(conn)
+        with transaction() as (conn, c):
+            c.execute(
+                "UPDATE users SET vote = vote + ? WHERE username = ?",
+                (vote_delta, username),
+            )
         return True
     except Exception as e:
         print(f"Error updating user vote: {e}")
@@ -110,10 +104,9 @@ def register_user(username: str, password: str) -> bool:
 
 def list_users() -> list:
     """获取所有用户列表"""
-    conn, c = get_db_connection()
-    c.execute("SELECT id, username, vote, created_at, role FROM users")
-    users = c.fetchall()
-    close_db_connection(conn)
+    with db_connection() as (conn, c):
+        c.execute("SELECT id, username, vote, created_at, role FROM users")
+        users = c.fetchall()
 
     return [
         {
@@ -134,13 +127,11 @@ def update_user_password(username: str, current_password: str, new_password: str
         return False
 
     try:
-        conn, c = get_db_connection()
-        c.execute(
-            "UPDATE users SET password = ? WHERE username = ?",
-            (new_password, username)
-        )
-        conn.commit()
-        close_db_connection(conn)
+        with transaction() as (conn, c):
+            c.execute(
+                "UPDATE users SET password = ? WHERE username = ?",
+                (new_password, username)
+            )
         return True
     except Exception as e:
         print(f"Error updating user password: {e}")
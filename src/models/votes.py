@@ -1,60 +1,84 @@
 import sqlite3
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any, List
-from .database import get_db_connection, close_db_connection
+from typing import Optional, Dict, Any, Iterator, List, Sequence, Tuple
+from .database import db_connection
 from .config import TZ
 
-# 投票历史表
+# 投票历史表（交易流水）
 # 表名：votes
-# 字段：id, question_id, username，vote，created_at, option, probability
+# 字段：id, question_id, username，vote，created_at, option, probability, trade_id, option_index
+# 只允许追加：由触发器禁止修改，只有问题已删除时才能删除对应记录
+# 只由 trades.execute_trade 写入，与概率、持仓和份额在同一事务中更新，流水可以完整重放
+# vote: 带符号的数量，正数为投票，负数为撤票
+# probability: 交易后该选项的概率
+# trade_id: 同一次交易的多条记录共用一个交易ID，重放时按交易整体定价
+# option_index: 选项在问题选项列表中的下标
+
+# 选项票数汇总表
+# 表名：option_totals
+# 字段：question_id，option_index，total
+# total: 该选项所有投票记录 vote 之和，随每次投票在同一事务中累加，详情页直接读取
 
 def init_votes_table():
     """初始化投票历史表"""
     try:
-        conn, c = get_db_connection()
-        # 检查表是否存在
-        c.execute('''SELECT count(name) FROM sqlite_master
-                     WHERE type='table' AND name='votes' ''')
-
-        if c.fetchone()[0] == 0:
-            c.execute('''CREATE TABLE votes
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                          question_id TEXT NOT NULL,
-                          username TEXT NOT NULL,
-                          vote REAL NOT NULL,
-                          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                          option TEXT NOT NULL,
-                          probability REAL NOT NULL)''')
+        with db_connection() as (conn, c):
+            # 检查表是否存在
+            c.execute('''SELECT count(name) FROM sqlite_master
+                         WHERE type='table' AND name='votes' ''')
+
+            if c.fetchone()[0] == 0:
+                c.execute('''CREATE TABLE votes
+                             (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              question_id TEXT NOT NULL,
+                              username TEXT NOT NULL,
+                              vote REAL NOT NULL,
+                              created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                              option TEXT NOT NULL,
+                              probability REAL NOT NULL,
+                              trade_id TEXT,
+                              option_index INTEGER)''')
+                conn.commit()
+            c.execute('''CREATE TABLE IF NOT EXISTS option_totals
+                         (question_id TEXT NOT NULL,
+                          option_index INTEGER NOT NULL,
+                          total REAL NOT NULL,
+                          PRIMARY KEY (question_id, option_index)) WITHOUT ROWID''')
             conn.commit()
-        close_db_connection(conn)
         return True
     except Exception as e:
         print(f"Error initializing votes table: {e}")
         return False
 
-def create_vote(question_id: str, username: str, vote: float, option: str, probability: float) -> bool:
-    """创建新的投票记录"""
-    try:
-        conn, c = get_db_connection()
-        c.execute('''INSERT INTO votes
-                    (question_id, username, vote, option, probability)
-                    VALUES (?, ?, ?, ?, ?)''',
-                 (question_id, username, vote, option, probability))
-        conn.commit()
-        close_db_connection(conn)
-        return True
-    except Exception as e:
-        print(f"Error creating vote: {e}")
-        return False
+def add_option_totals(cursor, question_id: str, amounts: Sequence[Tuple[int, float]]) -> None:
+    """在当前事务中累加选项票数汇总
+
+    Args:
+        amounts: (选项下标, 带符号数量) 列表
+    """
+    cursor.executemany('''INSERT INTO option_totals (question_id, option_index, total)
+                          VALUES (?, ?, ?)
+                          ON CONFLICT (question_id, option_index) DO UPDATE SET total = total + excluded.total''',
+                       [(question_id, option_index, amount) for option_index, amount in amounts])
+
+def get_option_vote_totals(question_id: str) -> Dict[int, float]:
+    """获取问题各选项的票数之和
+
+    Returns:
+        Dict[int, float]: 选项下标到票数之和的映射，没有投票的选项不在结果中
+    """
+    with db_connection() as (conn, c):
+        c.execute('''SELECT option_index, total FROM option_totals
+                     WHERE question_id = ?''', (question_id,))
+        return dict(c.fetchall())
 
 def get_user_votes(username: str) -> List[Dict[str, Any]]:
     """获取用户的所有投票历史"""
-    conn, c = get_db_connection()
-    c.execute('''SELECT id, question_id, vote, created_at, option, probability
-                 FROM votes WHERE username = ?
-                 ORDER BY created_at DESC''', (username,))
-    votes = c.fetchall()
-    close_db_connection(conn)
+    with db_connection() as (conn, c):
+        c.execute('''SELECT id, question_id, vote, created_at, option, probability
+                     FROM votes WHERE username = ?
+                     ORDER BY created_at DESC''', (username,))
+        votes = c.fetchall()
 
     return [{
         'id': vote[0],
@@ -66,29 +90,68 @@ def get_user_votes(username: str) -> List[Dict[str, Any]]:
     } for vote in votes]
 
 def get_question_votes(question_id: str) -> List[Dict[str, Any]]:
-    """获取某个问题的所有投票历史"""
-    conn, c = get_db_connection()
-    c.execute('''SELECT id, username, vote, created_at, option, probability
-                 FROM votes WHERE question_id = ?
-                 ORDER BY created_at DESC''', (question_id,))
-    votes = c.fetchall()
-    close_db_connection(conn)
+    """获取某个问题的所有投票历史（记录较多时请使用 get_question_votes_page 或 iter_question_votes）"""
+    return list(iter_question_votes(question_id))
 
-    return [{
+def _row_to_question_vote(vote) -> Dict[str, Any]:
+    """将问题投票记录行转换为字典"""
+    return {
         'id': vote[0],
         'username': vote[1],
         'vote': vote[2],
         'created_at': datetime.fromisoformat(vote[3]).astimezone(TZ).isoformat(),
         'option': vote[4],
         'probability': vote[5]
-    } for vote in votes]
+    }
+
+def get_question_votes_page(question_id: str, limit: int = 50,
+                            cursor: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """按时间倒序分页获取问题的投票记录（以 (created_at, id) 为游标）
+
+    Args:
+        question_id: 问题ID
+        limit: 每页数量
+        cursor: 上一页返回的游标，None表示第一页
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]: 本页记录和下一页游标，没有下一页时游标为None
+    """
+    with db_connection() as (conn, c):
+        if cursor is None:
+            c.execute('''SELECT id, username, vote, created_at, option, probability
+                         FROM votes WHERE question_id = ?
+                         ORDER BY created_at DESC, id DESC LIMIT ?''', (question_id, limit + 1))
+        else:
+            c.execute('''SELECT id, username, vote, created_at, option, probability
+                         FROM votes WHERE question_id = ? AND (created_at, id) < (?, ?)
+                         ORDER BY created_at DESC, id DESC LIMIT ?''', (question_id, *cursor, limit + 1))
+        rows = c.fetchall()
+
+    next_cursor = (rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+    return [_row_to_question_vote(vote) for vote in rows[:limit]], next_cursor
+
+def get_question_votes_since(question_id: str, after_id: int) -> List[Dict[str, Any]]:
+    """按时间倒序获取记录ID大于 after_id 的新增投票记录（用于在已加载的历史前追加新记录）"""
+    with db_connection() as (conn, c):
+        c.execute('''SELECT id, username, vote, created_at, option, probability
+                     FROM votes WHERE question_id = ? AND id > ?
+                     ORDER BY created_at DESC, id DESC''', (question_id, after_id))
+        return [_row_to_question_vote(vote) for vote in c.fetchall()]
+
+def iter_question_votes(question_id: str, page_size: int = 200) -> Iterator[Dict[str, Any]]:
+    """按时间倒序逐条产出问题的投票记录，每次只读取并解码一页"""
+    cursor = None
+    while True:
+        votes, cursor = get_question_votes_page(question_id, page_size, cursor)
+        yield from votes
+        if cursor is None:
+            return
 
 def check_user_voted(username: str, question_id: str) -> bool:
     """检查用户是否已经对某个问题投过票"""
-    conn, c = get_db_connection()
-    c.execute('''SELECT COUNT(*) FROM votes
-                 WHERE username = ? AND question_id = ?''',
-             (username, question_id))
-    count = c.fetchone()[0]
-    close_db_connection(conn)
+    with db_connection() as (conn, c):
+        c.execute('''SELECT COUNT(*) FROM votes
+                     WHERE username = ? AND question_id = ?''',
+                 (username, question_id))
+        count = c.fetchone()[0]
     return count > 0
@@ -0,0 +1,190 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from . import config
+from .database import get_pool, transaction
+
+# 写入队列
+# 写入以函数 fn(cursor) 的形式提交，由单个后台写线程按批次合并到一个事务中提交（group commit）。
+# 每个写入在独立的 SAVEPOINT 中执行，单个写入失败只回滚它自己，不影响同批次的其他写入。
+# 调用方拿到的 Future 在所在批次提交后才会完成。
+
+WriteFn = Callable[[sqlite3.Cursor], Any]
+
+_STOP = object()
+
+
+class WriteQueue:
+    """单写线程的批量写入队列"""
+
+    def __init__(self, batch_size: int = 64, max_delay: float = 0.005) -> None:
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "writes": 0,
+            "failed_writes": 0,
+            "failed_batches": 0,
+            "max_batch": 0,
+            "commit_seconds": 0.0,
+        }
+
+    def start(self) -> None:
+        """启动写线程"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="db-writer", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """提交队列中剩余的写入后停止写线程"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, fn: WriteFn) -> Future:
+        """提交一个写入，返回在提交后完成的 Future"""
+        self.start()
+        future: Future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def _run(self) -> None:
+        """写线程主循环：取出第一个写入后在 max_delay 内尽量凑满一批再提交"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = (
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+            if stop:
+                return
+
+    def _commit_batch(self, batch) -> None:
+        """在一个事务中执行一批写入"""
+        results = []
+        start = time.perf_counter()
+        try:
+            with transaction() as (conn, c):
+                for fn, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    c.execute("SAVEPOINT queued_write")
+                    try:
+                        result = fn(c)
+                    except Exception as e:
+                        c.execute("ROLLBACK TO queued_write")
+                        c.execute("RELEASE queued_write")
+                        results.append((future, None, e))
+                    else:
+                        c.execute("RELEASE queued_write")
+                        results.append((future, result, None))
+        except Exception as e:
+            # 提交失败时整批写入都未生效
+            with self._stats_lock:
+                self._stats["failed_batches"] += 1
+            for fn, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - start
+        failed = 0
+        for future, result, error in results:
+            if error is not None:
+                failed += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["writes"] += len(results)
+            self._stats["failed_writes"] += failed
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(results))
+            self._stats["commit_seconds"] += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        """写入队列统计信息"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        stats["avg_batch"] = stats["writes"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+
+_write_queue: Optional[WriteQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteQueue:
+    """获取进程内共享的写入队列"""
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue(
+                    batch_size=config.WRITE_QUEUE_BATCH_SIZE,
+                    max_delay=config.WRITE_QUEUE_MAX_DELAY_MS / 1000,
+                )
+                atexit.register(_write_queue.stop)
+    return _write_queue
+
+
+def _in_transaction() -> bool:
+    """当前线程是否已经处于写事务中"""
+    conn = get_pool().current_connection()
+    return conn is not None and conn.in_transaction
+
+
+def submit_write(fn: WriteFn) -> Future:
+    """提交一个写入
+
+    开启写入队列时交给写线程批量提交；未开启或当前线程已处于事务中时，
+    直接在当前线程的事务中执行。返回的 Future 在写入提交后完成。
+    """
+    if config.WRITE_QUEUE_ENABLED and not _in_transaction():
+        return get_write_queue().submit(fn)
+
+    future: Future = Future()
+    try:
+        with transaction() as (conn, c):
+            result = fn(c)
+    except Exception as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+    return future
+
+
+def run_write(fn: WriteFn) -> Any:
+    """提交一个写入并等待提交完成，返回写入函数的返回值"""
+    return submit_write(fn).result()
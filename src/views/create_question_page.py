@@ -3,6 +3,11 @@ from datetime import datetime
 import uuid
 from models.questions import create_question
 from models.database import get_db_connection, close_db_connection
+from models.pricing import DEFAULT_LIQUIDITY
+from views.data_context import invalidate
+
+# 定价方式选项到 pricing_mode 的映射
+PRICING_MODE_LABELS = {"固定步长": "linear", "LMSR 做市商": "lmsr"}
 
 
 # 创建问题页面
@@ -30,6 +35,8 @@ def create_question_data(
     expire_time,
     tags_input,
     username,
+    pricing_mode="linear",
+    liquidity=None,
 ):
     """创建问题数据结构"""
     tags = [
@@ -45,13 +52,15 @@ def create_question_data(
         "status": "progress",
         "type": "two" if question_type == "二元" else "multiple",
         "tags": ",".join(tags) if tags else None,
-        "options": ",".join([outcome[0] for outcome in outcomes]),
-        "probabilities": ",".join([str(outcome[1]) for outcome in outcomes]),
+        "options": [outcome[0] for outcome in outcomes],
+        "probabilities": [outcome[1] for outcome in outcomes],
         "rule": rules,
         "created_by": username,
         "expire_at": expire_datetime.isoformat(),
         "result": None,
         "end_at": None,
+        "pricing_mode": pricing_mode,
+        "liquidity": liquidity,
     }
 
 
@@ -114,6 +123,25 @@ def create_question_page():
 
     rules = st.text_area("📋 规则（markdown）", height=150)
 
+    # 定价方式设置
+    col1, col2 = st.columns(2)
+    with col1:
+        pricing_label = st.selectbox(
+            "💹 定价方式",
+            list(PRICING_MODE_LABELS.keys()),
+            help="固定步长：每票改变概率约1%；LMSR：自动做市商，大额交易不会把概率推到极端",
+        )
+    pricing_mode = PRICING_MODE_LABELS[pricing_label]
+    with col2:
+        liquidity = st.number_input(
+            "💧 流动性参数 b",
+            min_value=1.0,
+            value=DEFAULT_LIQUIDITY,
+            step=10.0,
+            help="越大概率对单笔交易越不敏感",
+            disabled=pricing_mode != "lmsr",
+        )
+
     # 过期时间设置
     col1, col2 = st.columns(2)
     with col1:
@@ -135,9 +163,12 @@ def create_question_page():
             expire_time,
             tags_input,
             username,
+            pricing_mode,
+            liquidity if pricing_mode == "lmsr" else None,
         )
 
         if create_question(question):
+            invalidate()
             st.write("✅ 问题创建成功！")
         else:
             st.write("❌ 问题创建失败，请重试！")
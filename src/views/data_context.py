@@ -0,0 +1,62 @@
+import streamlit as st
+from typing import Any, Callable, Dict
+
+# 单次运行的数据上下文
+# 每次脚本运行开始时重置，运行期间同一个模型读取函数以相同参数调用时只查询一次数据库。
+# 写入后调用 invalidate() 清空，后续读取会重新查询。
+# fragment 单独重新运行时不会经过 app.main()，由 begin_fragment() 判断并开始新的上下文。
+
+_CONTEXT_KEY = "_data_context"
+
+
+# 开始新的数据上下文
+def begin_rerun() -> None:
+    """开始新的一次运行，清空上一次运行缓存的读取结果"""
+    st.session_state[_CONTEXT_KEY] = {"results": {}, "queries": 0, "hits": 0, "fragments": set()}
+
+
+# 开始 fragment 的数据上下文
+def begin_fragment(name: str) -> None:
+    """在 fragment 开头调用：整页运行中沿用本次运行的上下文，fragment 单独重新运行时开始新的上下文"""
+    context = _get_context()
+    if name in context["fragments"]:
+        # 本次上下文中该 fragment 已经运行过，说明是 fragment 单独重新运行
+        begin_rerun()
+        context = _get_context()
+    context["fragments"].add(name)
+
+
+# 获取当前的数据上下文
+def _get_context() -> Dict[str, Any]:
+    """获取当前运行的数据上下文，尚未开始时自动创建"""
+    if _CONTEXT_KEY not in st.session_state:
+        begin_rerun()
+    return st.session_state[_CONTEXT_KEY]
+
+
+# 读取数据
+def read(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """调用模型读取函数，同一次运行中相同的函数和参数只查询一次（参数必须可哈希）"""
+    context = _get_context()
+    key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+    results = context["results"]
+    if key in results:
+        context["hits"] += 1
+        return results[key]
+    context["queries"] += 1
+    result = fn(*args, **kwargs)
+    results[key] = result
+    return result
+
+
+# 写入后清空缓存
+def invalidate() -> None:
+    """清空本次运行缓存的读取结果，写入数据后调用"""
+    _get_context()["results"].clear()
+
+
+# 获取统计信息
+def get_context_stats() -> Dict[str, int]:
+    """获取本次运行的查询次数和命中次数"""
+    context = _get_context()
+    return {"queries": context["queries"], "hits": context["hits"]}
@@ -0,0 +1,40 @@
+import streamlit as st
+from typing import Any, Optional
+
+# 每页显示的问题数量
+PAGE_SIZE = 50
+
+# 状态筛选选项到问题状态的映射，None表示全部
+STATUS_FILTERS = {"全部": None, "进行中": "progress", "已结束": "ended", "过期": "expired"}
+
+
+# 获取当前页的游标
+def get_page_cursor(key: str, filters: Any) -> Optional[Any]:
+    """获取当前页的游标，筛选条件变化时回到第一页"""
+    state_key = f"{key}_pagination"
+    state = st.session_state.get(state_key)
+    if state is None or state["filters"] != filters:
+        # 游标栈：第一页的游标为None，每翻一页压入下一页的游标
+        state = {"filters": filters, "cursors": [None]}
+        st.session_state[state_key] = state
+    return state["cursors"][-1]
+
+
+# 渲染翻页按钮
+def render_pagination(key: str, next_cursor: Optional[Any]) -> None:
+    """渲染上一页/下一页按钮"""
+    cursors = st.session_state[f"{key}_pagination"]["cursors"]
+    if len(cursors) == 1 and next_cursor is None:
+        return
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ 上一页", key=f"{key}_prev", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"第 {len(cursors)} 页")
+    with col3:
+        if st.button("下一页 ➡️", key=f"{key}_next", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
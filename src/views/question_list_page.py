@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
-from models.questions import list_questions, delete_question
+from models.questions import query_questions, get_tag_facets, delete_question
+from models.positions import get_positions_totals
+from views.pagination import PAGE_SIZE, STATUS_FILTERS, get_page_cursor, render_pagination
+from views.data_context import read, invalidate
 from datetime import datetime
 
 
@@ -11,42 +14,23 @@ def get_question_status(q):
 
 
 # 准备单个问题的数据
-def prepare_question_data(q, selected_tags, status_filter, current_user):
+def prepare_question_data(q, current_user, positions_totals=None):
     """准备单个问题的数据"""
-    # 标签筛选
     question_tags = q.get("tags", "").split(",") if q.get("tags") else []
-    if selected_tags and not any(tag in question_tags for tag in selected_tags):
-        return None
 
-    # 状态筛选
     status = q.get("status", "progress")
     status_map = {"progress": "进行中", "ended": "已结束", "expired": "已过期"}
     status = status_map.get(status, status)
 
-    if status_filter != "全部" and status != status_filter:
-        return None
-
-    # 计算总投票数
-    from models.positions import get_positions
-
-    positions = get_positions(q["id"])
-
-    # 解析所有用户的position字符串并计算总投票数
-    total_positions = 0
-    options = q["options"].split(",")
-    for user_id, position_str in positions.items():
-        position_parts = position_str.split(",")
-        for i, part in enumerate(position_parts):
-            if i < len(options) and part:
-                try:
-                    total_positions += float(part)
-                except ValueError:
-                    pass
+    # 总投票数由列表页批量查询得到
+    if positions_totals is None:
+        positions_totals = read(get_positions_totals, (q["id"],))
+    total_positions = positions_totals.get(q["id"], 0)
 
     # 获取选项和概率
-    options = q["options"].split(",")
-    probabilities = [float(p) for p in q["probabilities"].split(",")]
-    max_probability_idx = probabilities.index(max(probabilities))
+    options = q["options"]
+    probabilities = q["probabilities"]
+    max_probability_idx = int(probabilities.argmax())
 
     # 基础数据
     question_data = {
@@ -129,31 +113,32 @@ def question_list_page():
     # 获取当前用户名
     current_user = st.session_state.username if "username" in st.session_state else None
 
-    questions = list_questions()
-    if not questions:
-        st.info("暂无问题数据")
-        return
-
-    # 添加删除问题下拉框
+    # 添加删除问题下拉框（按页读取当前用户创建的问题）
     if current_user:
-        deletable_questions = [
-            q for q in questions if q["created_by"] == current_user
-        ]
+        delete_cursor = get_page_cursor("delete_question", current_user)
+        deletable_questions, delete_next_cursor = read(
+            query_questions, created_by=current_user, limit=PAGE_SIZE, cursor=delete_cursor
+        )
+        if not deletable_questions and delete_cursor is not None:
+            # 删除后当前页已空时回到上一页
+            st.session_state["delete_question_pagination"]["cursors"].pop()
+            st.rerun()
         if deletable_questions:
-            question_titles = [q["question"] for q in deletable_questions]
-            selected_question = st.selectbox(
+            question_titles = {q["id"]: q["question"] for q in deletable_questions}
+            selected_question_id = st.selectbox(
                 "🗑️ 选择要删除的问题",
-                question_titles,
+                list(question_titles.keys()),
+                format_func=question_titles.get,
                 index=None,
                 placeholder="选择您创建的问题进行删除"
             )
+            render_pagination("delete_question", delete_next_cursor)
 
-            if selected_question:
+            if selected_question_id:
+                selected_question = question_titles[selected_question_id]
                 if st.button("确认删除", type="primary"):
-                    question_to_delete = next(
-                        q for q in deletable_questions if q["question"] == selected_question
-                    )
-                    if delete_question(question_to_delete["id"], current_user):
+                    if delete_question(selected_question_id, current_user):
+                        invalidate()
                         st.success(f"✅ 问题 '{selected_question}' 已删除")
                         st.rerun()
                     else:
@@ -162,29 +147,36 @@ def question_list_page():
     # 添加标签和状态筛选
     col1, col2 = st.columns(2)
     with col1:
-        # 从问题数据中获取所有标签
-        all_tags = set()
-        for q in questions:
-            if q.get("tags"):
-                tags = [tag.strip() for tag in q["tags"].split(",") if tag.strip()]
-                all_tags.update(tags)
+        # 标签及其问题数由标签表统计并缓存
+        tag_facets = read(get_tag_facets)
         selected_tags = st.multiselect(
             "🏷️ 按标签筛选",
-            options=sorted(list(all_tags)) if all_tags else [],
+            options=list(tag_facets.keys()),
+            format_func=lambda tag: f"{tag} ({tag_facets.get(tag, 0)})",
             default=[],
             placeholder="选择标签进行筛选",
         )
     with col2:
         status_filter = st.radio(
-            "🔄 状态筛选", ["全部", "进行中", "已结束", "过期"], horizontal=True
+            "🔄 状态筛选", list(STATUS_FILTERS.keys()), horizontal=True
         )
 
-    # 准备表格数据
+    # 筛选、排序和分页在数据库中完成，只读取当前页的问题
+    status = STATUS_FILTERS[status_filter]
+    cursor = get_page_cursor("question_list", (status, tuple(selected_tags)))
+    questions, next_cursor = read(
+        query_questions, status=status, tags=tuple(selected_tags), limit=PAGE_SIZE, cursor=cursor
+    )
+    if not questions:
+        st.info("暂无问题数据")
+        return
+
+    # 准备表格数据，一次查询获取当前页问题的总投票数
+    positions_totals = read(get_positions_totals, tuple(q["id"] for q in questions))
     data = [
-        prepare_question_data(q, selected_tags, status_filter, current_user)
+        prepare_question_data(q, current_user, positions_totals)
         for q in questions
     ]
-    data = [d for d in data if d is not None]
 
     # 创建并显示表格
     df = pd.DataFrame(data)
@@ -195,3 +187,5 @@ def question_list_page():
     selected_rows = st.dataframe(
         df, column_config=column_config, use_container_width=True, hide_index=True
     )
+
+    render_pagination("question_list", next_cursor)
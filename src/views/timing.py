@@ -0,0 +1,27 @@
+import time
+import streamlit as st
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# 渲染耗时记录
+# 记录整页运行和各 fragment 最近一次运行的耗时（毫秒），用于比较局部重新运行与整页运行的开销
+
+_TIMINGS_KEY = "_render_timings"
+
+
+# 记录代码块耗时
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """记录代码块的运行耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = st.session_state.setdefault(_TIMINGS_KEY, {})
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+# 获取耗时记录
+def get_render_timings() -> Dict[str, float]:
+    """获取各部分最近一次运行的耗时（毫秒）"""
+    return dict(st.session_state.get(_TIMINGS_KEY, {}))
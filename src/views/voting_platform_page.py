@@ -2,48 +2,20 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import uuid
-from models.votes import create_vote, get_question_votes
-from models.questions import list_questions, end_question,update_question_probabilities
-from models.positions import get_positions, update_position
-
-# 计算新的概率值
-def calculate_new_probability(
-    current_probability,
-    amount,
-    is_vote=True,
-    all_probabilities=None,
-    selected_option=None,
-):
-    """计算新的概率值"""
-    if all_probabilities is None or selected_option is None:
-        return current_probability
-
-    # 计算当前选项的变化量
-    change = amount * 0.01
-    new_probability = (
-        current_probability + change if is_vote else current_probability - change
-    )
-    new_probability = max(0.01, min(0.99, new_probability))
-
-    # 计算其他选项需要调整的总量
-    total_adjustment = new_probability - current_probability
-
-    # 按比例调整其他选项的概率
-    other_probabilities = {
-        k: v for k, v in all_probabilities.items() if k != selected_option
-    }
-    total_other = sum(other_probabilities.values())
-
-    if total_other > 0:
-        for option in other_probabilities:
-            ratio = other_probabilities[option] / total_other
-            all_probabilities[option] -= total_adjustment * ratio
-            all_probabilities[option] = max(
-                0.01, min(0.99, all_probabilities[option])
-            )
-
-    return new_probability
-
+from models.votes import get_question_votes_page, get_question_votes_since, get_option_vote_totals
+from models.questions import query_questions, get_question, end_question
+from models.positions import get_positions
+from models.trades import MAX_ORDER_AMOUNT, execute_trade
+from models.pricing import order_vector, price_order
+from models.timeseries import get_price_history
+from models.cache import get_question_seq
+from models.config import TZ, LIVE_REFRESH_INTERVAL
+from views.pagination import PAGE_SIZE, STATUS_FILTERS, get_page_cursor, render_pagination
+from views.data_context import read, invalidate, begin_fragment
+from views.timing import timed, get_render_timings
+
+# 投票历史每页显示的记录数
+VOTE_HISTORY_PAGE_SIZE = 50
 
 # 显示问题详情
 def display_question_info(question):
@@ -51,6 +23,8 @@ def display_question_info(question):
     question_id = question["id"]
     st.markdown("**📋 问题详情**")
     st.markdown(f"**📊 类型:** {question['type']}")
+    if question["pricing_mode"] == "lmsr":
+        st.markdown(f"**💹 定价:** LMSR 做市商 (b = {question['liquidity']:g})")
     st.markdown(f"**📂 标签:** {question.get('tags', '')}")
     st.markdown(f"**👤 创建者:** {question['created_by']}")
     st.markdown(
@@ -65,45 +39,82 @@ def display_question_info(question):
     st.markdown("**📈 选项状态:**")
 
     data = []
-    options = question["options"].split(",")
-    probabilities = [float(p) for p in question["probabilities"].split(",")]
+    options = question["options"]
+    probabilities = question["probabilities"]
 
-    # 获取该问题的所有投票记录
-    votes = get_question_votes(question_id)
-    vote_counts = {}
-    for vote in votes:
-        vote_counts[vote["option"]] = vote_counts.get(vote["option"], 0) + vote["vote"]
+    # 各选项票数由汇总表直接读取
+    vote_counts = read(get_option_vote_totals, question_id)
 
-    for option, probability in zip(options, probabilities):
+    for i, (option, probability) in enumerate(zip(options, probabilities)):
         row_data = {
             "选项": option,
             "概率": f"{probability:.1%}",
-            "票数": f"{vote_counts.get(option, 0):.2f}",
+            "票数": f"{vote_counts.get(i, 0):.2f}",
         }
         data.append(row_data)
     df = pd.DataFrame(data)
     st.dataframe(df, hide_index=True)
 
 
+# 显示概率走势图
+def display_price_chart(question):
+    """显示概率走势图"""
+    st.markdown("**📈 概率走势**")
+    history = read(get_price_history, question["id"])
+    if not len(history["timestamps"]):
+        st.info("暂无交易记录")
+        return
+
+    index = pd.to_datetime(history["timestamps"], unit="s", utc=True).tz_convert(TZ)
+    chart_df = pd.DataFrame(history["probabilities"], index=index, columns=question["options"])
+    st.line_chart(chart_df)
+    resolution_labels = {"minute": "分钟", "hour": "小时", "day": "天"}
+    st.caption(f"按{resolution_labels[history['resolution']]}汇总，共 {len(chart_df)} 个点")
+
+
+# 投票历史行的显示格式
+def format_vote_row(vote):
+    """将投票记录转换为投票历史表格的一行"""
+    return {
+        "时间": datetime.fromisoformat(vote["created_at"]).strftime("%Y-%m-%d %H:%M"),
+        "用户": vote["username"],
+        "选项": vote["option"],
+        "票数": f"{vote['vote']:.2f}",
+        "概率": f"{vote['probability']:.1%}",
+    }
+
+
+# 加载下一页投票历史
+def load_more_votes(history, question_id):
+    """从保存的游标继续读取一页，追加到已加载的记录后"""
+    votes, history["cursor"] = get_question_votes_page(
+        question_id, VOTE_HISTORY_PAGE_SIZE, history["cursor"]
+    )
+    history["rows"].extend(format_vote_row(vote) for vote in votes)
+    history["last_id"] = max([history["last_id"], *(vote["id"] for vote in votes)])
+
+
 # 显示投票历史
 def display_voting_history(question_id):
-    """显示投票历史"""
+    """显示投票历史，每次加载一页，点击加载更多后只读取下一页"""
     st.markdown("**📜 投票历史记录**")
-    question_votes = get_question_votes(question_id)
-
-    if question_votes:
-        votes_data = []
-        for vote in question_votes:
-            votes_data.append(
-                {
-                    "时间": datetime.fromisoformat(vote["created_at"]).strftime("%Y-%m-%d %H:%M"),
-                    "用户": vote["username"],
-                    "选项": vote["option"],
-                    "票数": f"{vote['vote']:.2f}",
-                    "概率": f"{vote['probability']:.1%}",
-                }
-            )
-        votes_df = pd.DataFrame(votes_data)
+
+    # 已加载的记录、下一页游标和已见过的最大记录ID按问题保存在 session_state 中
+    history_key = f"vote_history_{question_id}"
+    history = st.session_state.get(history_key)
+    if history is None:
+        history = {"rows": [], "cursor": None, "last_id": 0}
+        load_more_votes(history, question_id)
+        st.session_state[history_key] = history
+    else:
+        # 只读取上次加载之后的新增记录，插入到最前面
+        newer = get_question_votes_since(question_id, history["last_id"])
+        if newer:
+            history["rows"][:0] = [format_vote_row(vote) for vote in newer]
+            history["last_id"] = max(vote["id"] for vote in newer)
+
+    if history["rows"]:
+        votes_df = pd.DataFrame(history["rows"])
         st.dataframe(
             votes_df,
             column_config={
@@ -116,6 +127,15 @@ def display_voting_history(question_id):
             use_container_width=True,
             hide_index=True,
         )
+        if history["cursor"] is not None:
+            # 在回调中读取下一页，按钮触发的（fragment）重新运行即会显示
+            st.button(
+                "⬇️ 加载更多",
+                key=f"vote_history_more_{question_id}",
+                on_click=load_more_votes,
+                args=(history, question_id),
+                use_container_width=True,
+            )
     else:
         st.info("暂无投票记录")
 
@@ -127,22 +147,14 @@ def handle_voting_operation(question):
     st.markdown("**🗳️ 投票操作**")
 
     # 获取选项和概率
-    options = question["options"].split(",")
-    probabilities = [float(p) for p in question["probabilities"].split(",")]
+    options = question["options"]
+    probabilities = question["probabilities"].tolist()
     options_with_prob = {opt: prob for opt, prob in zip(options, probabilities)}
 
     # 获取用户持仓
-    positions = get_positions(question_id, st.session_state.username)
-    position_values = {opt: 0 for opt in options}
-
-    if positions.get(st.session_state.username):
-        position_parts = positions[st.session_state.username].split(",")
-        for i, opt in enumerate(options):
-            if i < len(position_parts) and position_parts[i]:
-                try:
-                    position_values[opt] = float(position_parts[i])
-                except ValueError:
-                    position_values[opt] = 0
+    positions = read(get_positions, question_id, st.session_state.username)
+    user_position = positions.get(st.session_state.username, {})
+    position_values = {opt: user_position.get(i, 0) for i, opt in enumerate(options)}
 
     # 为每个选项创建操作区域
     amounts = {}
@@ -166,7 +178,7 @@ def handle_voting_operation(question):
                     amounts[option] = st.number_input(
                         "投票数量",
                         min_value=0.0,
-                        max_value=100.0,
+                        max_value=MAX_ORDER_AMOUNT,
                         step=0.1,
                         value=0.0,
                         format="%.1f",
@@ -193,65 +205,44 @@ def handle_voting_operation(question):
     col1, col2 = st.columns(2)
     with col1:
         if st.button("👀 预估结果", use_container_width=True):
-            probabilities_dict = dict(zip(options, probabilities))
-            for option, amount in amounts.items():
-                if amount > 0:
-                    current_prob = probabilities_dict[option]
-                    new_prob = calculate_new_probability(
-                        current_prob,
-                        amount,
-                        vote_types[option] == "yes",
-                        probabilities_dict.copy(),
-                        option,
-                    )
-                    probabilities_dict[option] = new_prob
-
+            # 与实际交易使用同一套定价计算
+            order = order_vector(options, {
+                option: amount if vote_types[option] == "yes" else -amount
+                for option, amount in amounts.items()
+            })
+            new_probabilities, _, cost = price_order(
+                question["pricing_mode"],
+                question["probabilities"],
+                order,
+                shares=question["shares"],
+                liquidity=question["liquidity"],
+            )
+            probabilities_dict = dict(zip(options, new_probabilities.tolist()))
             st.session_state.prediction_result = probabilities_dict
+            st.session_state.prediction_cost = cost
+            # 预估结果在下方同一次运行中显示，不需要重新运行
             st.session_state.show_prediction = not st.session_state.show_prediction
-            st.rerun()
 
     with col2:
         if st.button("✅ 执行操作", use_container_width=True):
-            probabilities_dict = dict(zip(options, probabilities))
-            for option, amount in amounts.items():
-                if amount > 0:
-                    if vote_types[option] == "no" and position_values.get(option, 0) < amount:
-                        st.toast(f"❌ 撤票数量不能超过持有量 {position_values.get(option, 0):.1f}", icon="⚠️")
-                        return
-
-                    current_prob = probabilities_dict[option]
-                    new_prob = calculate_new_probability(
-                        current_prob,
-                        amount,
-                        vote_types[option] == "yes",
-                        probabilities_dict,
-                        option,
-                    )
-
-                    # 更新概率
-                    prob_change = amount * 0.01 if vote_types[option] == "yes" else -amount * 0.01
-                    if not update_question_probabilities(question_id, option, prob_change):
-                        st.error(f"❌ 更新选项 {option} 概率失败")
-                        return
-
-                    # 更新持仓
-                    position_values[option] += amount if vote_types[option] == "yes" else -amount
-
-            # 更新所有持仓
-            position_str = ",".join([str(position_values.get(opt, 0)) for opt in options])
-            if not update_position(question_id, st.session_state.username, position_str):
-                st.error("❌ 更新持仓失败")
+            # 所有选项的投票/撤票在一个事务中执行
+            orders = {
+                option: amount if vote_types[option] == "yes" else -amount
+                for option, amount in amounts.items()
+                if amount > 0
+            }
+            if not orders:
+                st.toast("❌ 请输入投票或撤票数量", icon="⚠️")
                 return
 
-            # 记录投票
-            for option, amount in amounts.items():
-                if amount > 0:
-                    vote_amount = amount if vote_types[option] == "yes" else -amount
-                    if not create_vote(question_id, st.session_state.username, vote_amount, option, probabilities_dict[option]):
-                        st.error(f"❌ 记录选项 {option} 投票失败")
-                        return
+            trade = execute_trade(question_id, st.session_state.username, orders)
+            invalidate()
+            if not trade["success"]:
+                st.error(f"❌ {trade['message']}")
+                return
 
-            st.toast(f"✅ 操作成功: 投票/撤票完成", icon="🎯")
+            cost_text = f"，成本 {trade['cost']:.2f}" if trade["cost"] is not None else ""
+            st.toast(f"✅ 操作成功: 投票/撤票完成{cost_text} ({trade['latency_ms']:.1f} ms)", icon="🎯")
             st.session_state.show_prediction = False
             st.rerun()
 
@@ -264,17 +255,8 @@ def handle_voting_operation(question):
                 "预估概率": f"{st.session_state.prediction_result.get(opt, 0):.1%}"
             } for opt in options]
             st.dataframe(pd.DataFrame(pred_data), hide_index=True)
-
-# 根据状态筛选问题
-def filter_questions_by_status(questions, status_filter):
-    """根据状态筛选问题"""
-    if status_filter == "进行中":
-        return [q for q in questions if q.get("status") == "progress"]
-    elif status_filter == "已结束":
-        return [q for q in questions if q.get("status") == "ended"]
-    elif status_filter == "过期":
-        return [q for q in questions if q.get("status") == "expired"]
-    return questions
+            if st.session_state.get("prediction_cost") is not None:
+                st.caption(f"预估成本: {st.session_state.prediction_cost:.2f}")
 
 # 创建问题选择字典
 def create_question_selection_dict(filtered_questions):
@@ -289,10 +271,11 @@ def handle_end_question(question):
     """处理结束问题操作"""
     with st.expander("🔒 结束问题"):
         st.write("**请选择胜出选项**")
-        result = st.selectbox("胜出选项", question["options"].split(","))
+        result = st.selectbox("胜出选项", question["options"])
         if st.button("确认结束"):
             if st.session_state.username == question["created_by"]:
                 if end_question(question["id"], result, st.session_state.username):
+                    invalidate()
                     question["result"] = result
                     question["end_at"] = datetime.now()
                     question["end_by"] = st.session_state.username
@@ -303,6 +286,65 @@ def handle_end_question(question):
             else:
                 st.error("只有问题创建者可以结束问题")
 
+# 问题信息 fragment
+@st.fragment
+def question_info_fragment(question_id):
+    """问题详情和概率走势"""
+    begin_fragment("question_info")
+    with timed("question_info"):
+        question = read(get_question, question_id)
+        if question is None:
+            st.warning("问题不存在或已被删除")
+            return
+        with st.container(border=True):
+            display_question_info(question)
+        with st.container(border=True):
+            display_price_chart(question)
+
+
+# 交易面板 fragment
+@st.fragment
+def trading_fragment(question_id):
+    """结束问题和投票操作，输入变化时只重新运行交易面板（预估结果依赖交易输入，在同一 fragment 中）"""
+    begin_fragment("trading")
+    with timed("trading"):
+        # 单独重新运行时读取最新的问题状态
+        question = read(get_question, question_id)
+        if question is None or question.get("status") != "progress":
+            st.info("问题已结束，无法继续交易")
+            return
+        if st.session_state.username == question["created_by"]:
+            handle_end_question(question)
+        with st.container(border=True):
+            handle_voting_operation(question)
+
+    timings = get_render_timings()
+    if "app" in timings:
+        st.caption(f"⏱️ 交易面板 {timings['trading']:.1f} ms · 整页 {timings['app']:.1f} ms")
+
+
+# 投票历史 fragment
+@st.fragment
+def voting_history_fragment(question_id):
+    """投票历史，加载更多时只重新运行投票历史"""
+    begin_fragment("voting_history")
+    with timed("voting_history"):
+        with st.container(border=True):
+            display_voting_history(question_id)
+
+
+# 实时刷新 fragment
+@st.fragment(run_every=LIVE_REFRESH_INTERVAL)
+def live_refresh_fragment(question_id):
+    """定时轮询问题的变更序号，只有序号增加时才重新运行整页"""
+    seq_key = f"live_seq_{question_id}"
+    seq = get_question_seq(question_id)
+    if seq != st.session_state.get(seq_key, seq):
+        st.rerun()
+    st.session_state[seq_key] = seq
+    st.caption(f"🔴 实时刷新中，每 {LIVE_REFRESH_INTERVAL:g} 秒检查一次新交易")
+
+
 # 投票平台页面
 def voting_platform_page():
     """投票平台页面"""
@@ -312,18 +354,17 @@ def voting_platform_page():
     if "prediction_result" not in st.session_state:
         st.session_state.prediction_result = None
 
-    questions = list_questions()
-    if not questions:
-        st.warning("目前没有可用的问题")
-        return
-
     # 添加状态筛
     status_filter = st.radio(
-        "🔄 状态筛选", ["全部", "进行中", "已结束", "过期"], horizontal=True
+        "🔄 状态筛选", list(STATUS_FILTERS.keys()), horizontal=True
     )
 
-    # 筛选问题
-    filtered_questions = filter_questions_by_status(questions, status_filter)
+    # 在数据库中按状态筛选，只读取当前页的问题
+    status = STATUS_FILTERS[status_filter]
+    cursor = get_page_cursor("voting_platform", status)
+    filtered_questions, next_cursor = read(
+        query_questions, status=status, limit=PAGE_SIZE, cursor=cursor
+    )
     questions_with_status = create_question_selection_dict(filtered_questions)
 
     if not questions_with_status:
@@ -333,17 +374,15 @@ def voting_platform_page():
     # 选择问题
     selected_question_title = st.selectbox("选择问题", list(questions_with_status.keys()))
     question = questions_with_status[selected_question_title]
+    render_pagination("voting_platform", next_cursor)
 
-    # 显示问题信息
-    with st.container(border=True):
-        display_question_info(question)
+    # 实时刷新：整页运行时记录当前序号，之后由轮询 fragment 判断是否有新的变更
+    if st.toggle("🔴 实时刷新", help="其他用户交易后自动更新概率和投票历史"):
+        st.session_state[f"live_seq_{question['id']}"] = get_question_seq(question["id"])
+        live_refresh_fragment(question["id"])
 
-    # 处理未结束问题的操作
+    # 问题信息、交易面板和投票历史分别作为 fragment，交互时只重新运行所在部分
+    question_info_fragment(question["id"])
     if question.get("status") == "progress":
-        if st.session_state.username == question["created_by"]: handle_end_question(question)
-        with st.container(border=True):
-            handle_voting_operation(question)
-
-    # 显示投票历史
-    with st.container(border=True):
-        display_voting_history(question["id"])
+        trading_fragment(question["id"])
+    voting_history_fragment(question["id"])
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models import config  # noqa: E402
+from models.database import close_pool  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """在临时目录中建表并执行迁移，测试结束后关闭连接池"""
+    from data import init_database
+
+    monkeypatch.setattr(config, "DB_PATH", str(tmp_path / "voting_platform.db"))
+    close_pool()
+    assert init_database()
+    yield
+    close_pool()
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from models.database import transaction
+from models.questions import create_question
+from models.timeseries import get_price_history
+
+
+def _create_question(question_id, options):
+    assert create_question({
+        "id": question_id,
+        "created_at": datetime.now(),
+        "question": question_id,
+        "status": "progress",
+        "type": "multi",
+        "tags": "",
+        "options": options,
+        "probabilities": [1 / len(options)] * len(options),
+        "rule": "",
+        "created_by": "tester",
+        "expire_at": "2030-01-01T00:00:00",
+        "result": None,
+        "end_at": None,
+    })
+
+
+def _insert_closes(question_id, resolution, rows):
+    """写入只包含部分选项的汇总行，与迁移回填的数据形式相同"""
+    with transaction() as (conn, c):
+        c.executemany(
+            """INSERT INTO price_rollups (question_id, resolution, bucket, option_index, open, high, low, close, trades)
+               VALUES (?1, ?2, ?3, ?4, ?5, ?5, ?5, ?5, 1)""",
+            [(question_id, resolution, bucket, option_index, close) for bucket, option_index, close in rows],
+        )
+
+
+def test_history_has_a_column_for_every_option(db):
+    # 最后一个选项从未成交，第二个选项在第二个桶中没有记录
+    options = ["A", "B", "C"]
+    _create_question("q-partial", options)
+    _insert_closes("q-partial", "minute", [
+        (60, 0, 0.5), (60, 1, 0.3),
+        (120, 0, 0.6),
+        (180, 0, 0.4), (180, 1, 0.4),
+    ])
+
+    history = get_price_history("q-partial", resolution="minute")
+
+    probabilities = history["probabilities"]
+    assert probabilities.shape == (3, len(options))
+    np.testing.assert_allclose(probabilities[:, 0], [0.5, 0.6, 0.4])
+    np.testing.assert_allclose(probabilities[:, 1], [0.3, 0.3, 0.4])
+    assert np.isnan(probabilities[:, 2]).all()
+    # 页面按问题选项构造图表数据
+    chart_df = pd.DataFrame(probabilities, columns=options)
+    assert list(chart_df.columns) == options
+
+
+def test_resolution_is_chosen_when_first_option_never_traded(db):
+    _create_question("q-second", ["A", "B"])
+    _insert_closes("q-second", "minute", [(60, 1, 0.7)])
+    _insert_closes("q-second", "hour", [(0, 1, 0.7)])
+    _insert_closes("q-second", "day", [(0, 1, 0.7)])
+
+    history = get_price_history("q-second")
+
+    assert history["resolution"] == "minute"
+    assert history["probabilities"].shape == (1, 2)
+    assert np.isnan(history["probabilities"][0, 0])
+    assert history["probabilities"][0, 1] == 0.7